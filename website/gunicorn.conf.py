@@ -0,0 +1,44 @@
+"""
+Gunicorn settings, picked up automatically from the working directory
+(the Procfile runs gunicorn from website/).
+
+Every value can be overridden with an environment variable so a dyno size
+change doesn't need a code change.
+"""
+import multiprocessing
+import os
+
+# One process per core (plus one). Heroku sets WEB_CONCURRENCY from the
+# dyno's memory, which wins over the host CPU count a dyno reports.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# The Procfile serves website.asgi with uvicorn workers, so the live
+# occupancy stream (main/occupancy.py) holds an open connection without
+# tying up a thread. To go back to WSGI (the stream then degrades to
+# reconnects), serve website.wsgi with GUNICORN_WORKER_CLASS=gthread;
+# threads only applies to that worker class.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django (and precompile templates, see TEMPLATE_WARMUP) once in the
+# master and fork the workers from it: faster boot and shared memory pages.
+preload_app = True
+
+# Recycle workers now and then to contain slow memory growth; the jitter
+# stops all of them restarting at the same moment.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared
+    # between workers.
+    from django.db import connections
+    connections.close_all()
@@ -1,9 +1,21 @@
 from django.contrib import admin
-from .models import Instructor, Membership, Routine, Exercise, UserProfile
+from .models import (
+    Location, Instructor, Membership, Routine, RoutineNeighbor, Exercise, UserProfile, Tombstone, MembershipPeriod, NotificationLog, Task,
+    ArchivedMembership, ArchivedMembershipPeriod, ArchivedEnrollment,
+)
 
 # Register all models
+admin.site.register(Location)
 admin.site.register(Instructor)
 admin.site.register(Membership)
 admin.site.register(Routine)
+admin.site.register(RoutineNeighbor)
 admin.site.register(Exercise)
-admin.site.register(UserProfile)
\ No newline at end of file
+admin.site.register(UserProfile)
+admin.site.register(Tombstone)
+admin.site.register(MembershipPeriod)
+admin.site.register(NotificationLog)
+admin.site.register(Task)
+admin.site.register(ArchivedMembership)
+admin.site.register(ArchivedMembershipPeriod)
+admin.site.register(ArchivedEnrollment)
\ No newline at end of file
@@ -7,4 +7,7 @@ class MainConfig(AppConfig):
     #name = 'website.main'
 
     def ready(self):
+        import main.checks
         import main.signals
+        import main.tasks
+        import main.locations
@@ -0,0 +1,133 @@
+"""
+Archival of inactive members.
+
+Archiving a member soft-deletes their profile (UserProfile.archived_at, hidden
+by the default manager) and moves their membership, its period history and
+their routine enrollments into the Archived* tables. The live tables that
+members_list and the dashboard read stay small, and the history is still
+there for reporting.
+
+Members are archived in batches, each batch in its own transaction, with a
+fixed number of queries per batch.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Membership,
+    MembershipPeriod,
+    NotificationLog,
+    Routine,
+    UserProfile,
+    ArchivedMembership,
+    ArchivedMembershipPeriod,
+    ArchivedEnrollment,
+)
+from .services import _raw_delete, _record_tombstones, _uncount
+
+
+def archivable_user_ids(today=None, after_days=None):
+    """
+    Users to archive: deactivated accounts, and members whose membership ran
+    out more than ``after_days`` (ARCHIVE_AFTER_DAYS) ago and does not renew.
+    Admins are never archived.
+    """
+    today = today or date.today()
+    if after_days is None:
+        after_days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = today - timedelta(days=after_days)
+    lapsed = Q(
+        user__membership__expires_on__lt=cutoff,
+        user__membership__paused_on__isnull=True,
+        user__membership__auto_renew=False,
+    )
+    return (
+        UserProfile.objects
+        .filter(is_admin=False)
+        .filter(Q(user__is_active=False) | lapsed)
+        .values_list('user_id', flat=True)
+    )
+
+
+@transaction.atomic
+def _archive_batch(user_ids, now):
+    profiles = UserProfile.objects.filter(user_id__in=user_ids)
+    profile_ids = list(profiles.values_list('pk', flat=True))
+    memberships = Membership.objects.filter(user_id__in=user_ids)
+    periods = MembershipPeriod.objects.filter(membership__user_id__in=user_ids)
+    enrollments = Routine.clients.through.objects.filter(userprofile_id__in=profile_ids)
+
+    ArchivedMembership.objects.bulk_create([
+        ArchivedMembership(
+            id=row['id'],
+            user_id=row['user_id'],
+            username=row['user__username'],
+            location_id=row['location_id'],
+            plan_type=row['plan_type'],
+            start_date=row['start_date'],
+            duration_days=row['duration_days'],
+            expires_on=row['expires_on'],
+            auto_renew=row['auto_renew'],
+            created_at=row['created_at'],
+            archived_at=now,
+        )
+        for row in memberships.values(
+            'id', 'user_id', 'user__username', 'location_id', 'plan_type', 'start_date',
+            'duration_days', 'expires_on', 'auto_renew', 'created_at',
+        )
+    ])
+    ArchivedMembershipPeriod.objects.bulk_create([
+        ArchivedMembershipPeriod(**row)
+        for row in periods.values(
+            'id', 'membership_id', 'kind', 'plan_type', 'start_date', 'end_date', 'duration_days', 'created_at',
+        )
+    ])
+    ArchivedEnrollment.objects.bulk_create([
+        ArchivedEnrollment(
+            user_id=row['userprofile__user_id'],
+            username=row['userprofile__user__username'],
+            routine_id=row['routine_id'],
+            routine_name=row['routine__name'],
+            archived_at=now,
+        )
+        for row in enrollments.values(
+            'userprofile__user_id', 'userprofile__user__username', 'routine_id', 'routine__name',
+        )
+    ])
+
+    membership_owners = dict(memberships.values_list('pk', 'user_id'))
+    membership_ids = list(membership_owners)
+    _record_tombstones(Membership, membership_ids, membership_owners)
+    _record_tombstones(UserProfile, profile_ids, dict(profiles.values_list('pk', 'user_id')))
+
+    # Dependents first; current_period points back at the periods, so clear it
+    memberships.update(current_period=None)
+    _raw_delete(NotificationLog.objects.filter(membership_id__in=membership_ids))
+    _raw_delete(MembershipPeriod.objects.filter(membership_id__in=membership_ids))
+    _raw_delete(Membership.objects.filter(pk__in=membership_ids))
+    _uncount("client_count", enrollments)
+    _raw_delete(enrollments)
+    return profiles.update(archived_at=now, updated_at=now)
+
+
+def archive_members(user_ids, batch_size=None):
+    """Archive the given users' profiles. Returns the number archived."""
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    user_ids = list(user_ids)
+    now = timezone.now()
+    archived = 0
+    for start in range(0, len(user_ids), batch_size):
+        archived += _archive_batch(user_ids[start:start + batch_size], now)
+    return archived
+
+
+def restore_member(user):
+    """Bring an archived member back, e.g. when they sign up again."""
+    now = timezone.now()
+    return UserProfile.all_objects.filter(user=user, archived_at__isnull=False).update(
+        archived_at=None, updated_at=now,
+    )
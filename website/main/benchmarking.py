@@ -0,0 +1,56 @@
+"""
+Shared helpers for the bench_* management commands.
+
+Benchmarks run against a throwaway test database (the same one `manage.py
+test` would create), so they never touch real data.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, reset_queries
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+
+@contextmanager
+def test_database():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, runs, query_filter=None):
+    """
+    Call ``func`` ``runs`` times. Returns a dict with the median and p95 time
+    in ms and the average number of queries per call (only the queries whose
+    SQL contains ``query_filter``, or one of them if it is a tuple).
+    """
+    if isinstance(query_filter, str):
+        query_filter = (query_filter,)
+    timings = []
+    queries = 0
+    for _ in range(runs):
+        # connection.queries is capped; start each run with an empty log
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries += sum(
+            1 for query in captured.captured_queries
+            if query_filter is None or any(part in query["sql"] for part in query_filter)
+        )
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "queries": queries / runs,
+    }
@@ -0,0 +1,40 @@
+"""
+System checks for settings that only break once deployed.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if not settings.TASKS_EAGER and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            "TASKS_EAGER is off but the default cache is per-process.",
+            hint=(
+                "The task worker fills the cache for the web processes (weather), "
+                "so they need a shared cache: set REDIS_URL or use DatabaseCache."
+            ),
+            id='main.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_rate_limit_cache(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.RATELIMITS and backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            "Rate limits are counted in a per-process cache.",
+            hint=(
+                "Every web worker keeps its own counters, so the real limit is "
+                "RATELIMITS times the number of workers. Set REDIS_URL or use DatabaseCache."
+            ),
+            id='main.W001',
+        )]
+    return []
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from django.urls import reverse_lazy
 from .models import Membership, Routine, Exercise, Instructor, UserProfile
 
 
@@ -34,25 +35,106 @@ class NewMembershipForm(forms.Form):
         choices = duration_options,
         label="Select Plan Duration"
         )
+    auto_renew = forms.BooleanField(
+        required=False,
+        label="Renew automatically when it runs out"
+        )
+
+
+class ReportFilterForm(forms.Form):
+    plan = forms.ChoiceField(
+        choices=[('', 'All plans')] + Membership.PLAN_CHOICES,
+        required=False,
+    )
+    duration = forms.TypedChoiceField(
+        choices=(('', 'All durations'),) + NewMembershipForm.duration_options,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+    all_branches = forms.BooleanField(required=False, label="All branches")
+
+
+class ChangePlanForm(forms.Form):
+    plan_type = forms.ChoiceField(
+        choices=Membership.PLAN_CHOICES,
+        label="New plan (starts today)"
+    )
+class ClientAutocompleteWidget(forms.SelectMultiple):
+    """
+    Multi-select that only renders the clients already chosen. Other clients
+    are found through the search-as-you-type endpoint (see script.js).
+    """
+    template_name = 'main/widgets/client_autocomplete.html'
+
+    def __init__(self, attrs=None):
+        attrs = {'data-autocomplete-url': reverse_lazy('client-search'), **(attrs or {})}
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        selected_ids = [v for v in value if str(v).isdigit()]
+        selected = UserProfile.objects.filter(pk__in=selected_ids).select_related('user')
+        return [
+            (None, [self.create_option(name, profile.pk, str(profile), True, index, attrs=attrs)], index)
+            for index, profile in enumerate(selected)
+        ]
+
+
 class RoutineForm(forms.ModelForm):
     class Meta:
         model = Routine
         fields = ['name', 'description', 'instructor', 'duration_minutes', 'clients']
         widgets = {
-            'clients': forms.CheckboxSelectMultiple()
+            'clients': ClientAutocompleteWidget()
         }
 
+    def __init__(self, *args, location=None, **kwargs):
+        """
+        New routines go to ``location`` (the branch being viewed); existing
+        ones stay where they are. Only that branch's instructors are offered.
+        """
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is None:
+            self.instance.location = location
+        if self.instance.location_id:
+            self.fields['instructor'].queryset = Instructor.objects.for_location(self.instance.location_id)
+
+    def _save_m2m(self):
+        """
+        Save clients as a diff against what is stored: one SELECT of the
+        current ids, then a single bulk INSERT and a single DELETE on the
+        through table for the clients that were added or removed.
+        """
+        routine = self.instance
+        wanted = {profile.pk for profile in self.cleaned_data['clients']}
+        current = set(routine.clients.through.objects.filter(
+            routine_id=routine.pk
+        ).values_list('userprofile_id', flat=True))
+
+        # add()/remove() run one bulk query each and still send m2m_changed
+        to_add = wanted - current
+        to_remove = current - wanted
+        if to_add:
+            routine.clients.add(*to_add)
+        if to_remove:
+            routine.clients.remove(*to_remove)
+
 
 class ExerciseForm(forms.ModelForm):
     class Meta:
         model = Exercise
         fields = ['routine', 'name', 'description', 'repetitions']
 
+    def __init__(self, *args, location=None, **kwargs):
+        """Only the routines of ``location`` (the branch being viewed) are offered."""
+        super().__init__(*args, **kwargs)
+        self.fields['routine'].queryset = Routine.objects.for_location(location)
+
 
 class InstructorForm(forms.ModelForm):
     class Meta:
         model = Instructor
-        fields = ['user', 'specialty', 'bio']
+        fields = ['user', 'location', 'specialty', 'bio']
 
 class AdminUserForm(forms.ModelForm):
     """Form to edit basic User fields from the admin dashboard."""
@@ -67,4 +149,47 @@ class AdminUserProfileForm(forms.ModelForm):
 
     class Meta:
         model = UserProfile
-        fields = ["phone", "is_admin"]
\ No newline at end of file
+        fields = ["phone", "is_admin"]
+
+class _PreloadedChoiceField(forms.ModelChoiceField):
+    """Hidden pk field that looks rows up in a dict instead of one SELECT each."""
+
+    def __init__(self, objects, *args, **kwargs):
+        self.objects = objects
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+
+
+class BaseExerciseFormSet(forms.BaseModelFormSet):
+    """Validates every row against the queryset loaded once by the formset."""
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if not hasattr(self, "_objects_by_pk"):
+            self._objects_by_pk = {obj.pk: obj for obj in self.get_queryset()}
+        pk_field = form.fields["id"]
+        form.fields["id"] = _PreloadedChoiceField(
+            self._objects_by_pk,
+            queryset=pk_field.queryset,
+            initial=pk_field.initial,
+            required=False,
+            widget=pk_field.widget,
+        )
+
+
+ExerciseFormSet = forms.modelformset_factory(
+    Exercise,
+    formset=BaseExerciseFormSet,
+    fields=['name', 'description', 'repetitions'],
+    extra=5,
+    can_delete=True,
+)
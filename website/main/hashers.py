@@ -0,0 +1,20 @@
+"""
+Password hashers with their cost taken from settings.
+
+They keep Django's algorithm names, so hashes stored with the stock hashers
+keep working. When a user logs in with a hash made by another algorithm or
+with other parameters, Django re-hashes the password with the first hasher
+in PASSWORD_HASHERS and saves it (see User.check_password).
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = settings.PBKDF2_ITERATIONS
@@ -0,0 +1,81 @@
+"""
+Gym branches (Location) and which one a request is about.
+
+LocationMiddleware sets ``request.location`` once per request: the branch
+picked with the switcher (stored in the session), else the member's own
+branch, else DEFAULT_LOCATION. Views then scope their querysets with
+``Model.objects.for_location(request.location)``.
+
+The branch list is tiny and read on every request, so it is cached and
+dropped whenever a Location is saved or deleted.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Location, Membership
+
+SESSION_KEY = "location_id"
+CACHE_KEY = "locations"
+CACHE_SECONDS = 300
+
+
+def all_locations():
+    """Every branch, by id, from the cache."""
+    locations = cache.get(CACHE_KEY)
+    if locations is None:
+        locations = {location.pk: location for location in Location.objects.all()}
+        cache.set(CACHE_KEY, locations, CACHE_SECONDS)
+    return locations
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def forget_locations(**kwargs):
+    cache.delete(CACHE_KEY)
+
+
+def default_location():
+    locations = all_locations()
+    for location in locations.values():
+        if location.slug == settings.DEFAULT_LOCATION:
+            return location
+    return next(iter(locations.values()), None)
+
+
+def resolve_location(request):
+    locations = all_locations()
+    location_id = request.session.get(SESSION_KEY)
+    if location_id in locations:
+        return locations[location_id]
+    if not request.user.is_authenticated:
+        return default_location()
+
+    # First request of the session: start members at their own branch and
+    # remember it, so this lookup runs once per session
+    location_id = (
+        Membership.objects.filter(user=request.user)
+        .values_list("location_id", flat=True)
+        .first()
+    )
+    location = locations.get(location_id) or default_location()
+    if location is not None:
+        request.session[SESSION_KEY] = location.pk
+    return location
+
+
+def switch_location(request, location_id):
+    """Remember the branch picked in the switcher. Returns False if unknown."""
+    if location_id not in all_locations():
+        return False
+    request.session[SESSION_KEY] = location_id
+    return True
+
+
+def location(request):
+    """Context processor: the current branch and the switcher choices."""
+    return {
+        "location": getattr(request, "location", None),
+        "locations": all_locations().values(),
+    }
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.memberships import advance_periods
+
+
+class Command(BaseCommand):
+    help = (
+        "Switch memberships over to renewal periods that start today (plan and "
+        "current period). Meant to run daily from a scheduler."
+    )
+
+    def handle(self, *args, **options):
+        moved = advance_periods()
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} memberships to their next period."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from main.archive import archivable_user_ids, archive_members
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive deactivated members and members whose membership lapsed "
+        "more than --after-days ago. Meant to run from a scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after-days", type=int, help="Default: ARCHIVE_AFTER_DAYS.")
+        parser.add_argument("--batch-size", type=int, help="Default: ARCHIVE_BATCH_SIZE.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the members that would be archived.")
+
+    def handle(self, *args, **options):
+        user_ids = list(archivable_user_ids(after_days=options["after_days"]))
+        if options["dry_run"]:
+            self.stdout.write(f"{len(user_ids)} members would be archived.")
+            return
+
+        archived = archive_members(user_ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} members."))
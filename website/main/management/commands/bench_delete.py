@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from main.benchmarking import measure, test_database
+from main.models import Exercise, Instructor, Location, Routine
+from main.services import delete_instructors
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare Instructor.delete() with services.delete_instructors() on an "
+        "instructor with many routines and exercises. Runs against a "
+        "throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--routines", type=int, default=500)
+        parser.add_argument("--exercises", type=int, default=10_000, help="Total, spread over the routines.")
+        parser.add_argument("--clients", type=int, default=50, help="Clients enrolled in every routine.")
+
+    def handle(self, *args, **options):
+        with test_database():
+            User = get_user_model()
+            clients = [
+                User.objects.create_user(f"client{i}").profile
+                for i in range(options["clients"])
+            ]
+            self.stdout.write(f"{'method':<22}{'ms':>10}{'queries':>10}")
+            for label, delete in (
+                ("Instructor.delete()", lambda instructor: instructor.delete()),
+                ("delete_instructors()", lambda instructor: delete_instructors([instructor.pk])),
+            ):
+                instructor = self._populate(clients, options)
+                stats = measure(lambda: delete(instructor), runs=1)
+                assert not Routine.objects.exists() and not Exercise.objects.exists()
+                queries = f"{stats['queries']:.0f}"
+                if stats["queries"] >= connection.queries_limit:
+                    queries += "+"  # the query log is capped
+                self.stdout.write(f"{label:<22}{stats['median_ms']:>10.1f}{queries:>10}")
+
+    @transaction.atomic
+    def _populate(self, clients, options):
+        User = get_user_model()
+        user = User.objects.create_user(f"instructor-{User.objects.count()}")
+        location, _ = Location.objects.get_or_create(slug="bench", defaults={"name": "Bench", "city": "Mendoza"})
+        instructor = Instructor.objects.create(user=user, location=location, specialty="Functional")
+        routines = Routine.objects.bulk_create([
+            Routine(name=f"Routine {i}", description="", instructor=instructor, location=location)
+            for i in range(options["routines"])
+        ])
+        per_routine = max(options["exercises"] // max(len(routines), 1), 1)
+        Exercise.objects.bulk_create([
+            Exercise(routine=routine, name=f"Exercise {i}", description="")
+            for routine in routines
+            for i in range(per_routine)
+        ], batch_size=1000)
+        Enrollment = Routine.clients.through
+        Enrollment.objects.bulk_create([
+            Enrollment(routine=routine, userprofile=client)
+            for routine in routines
+            for client in clients
+        ], batch_size=1000)
+        return instructor
@@ -0,0 +1,65 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers, make_password, check_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from main.benchmarking import test_database
+
+PASSWORD = "class-start-rush-123"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password hashing cost per login for each configured hasher, "
+        "login throughput under a burst, and how the login rate limiter "
+        "answers a credential-stuffing burst."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=40, help="Logins per burst.")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent logins in a burst.")
+
+    def handle(self, *args, **options):
+        logins, threads = options["logins"], options["threads"]
+
+        self.stdout.write(f"{'hasher':<32}{'ms/login':>10}{'burst logins/s':>16}")
+        for hasher in get_hashers():
+            try:
+                encoded = make_password(PASSWORD, hasher=hasher.algorithm)
+            except ValueError:
+                # Optional library (bcrypt, ...) not installed
+                continue
+
+            start = time.perf_counter()
+            for _ in range(5):
+                check_password(PASSWORD, encoded)
+            per_login = (time.perf_counter() - start) * 1000 / 5
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(lambda _: check_password(PASSWORD, encoded), range(logins)))
+            throughput = logins / (time.perf_counter() - start)
+
+            self.stdout.write(f"{type(hasher).__name__:<32}{per_login:>10.1f}{throughput:>16.1f}")
+
+        with test_database():
+            cache.clear()
+            client = Client()
+            statuses = {}
+            # Every 429 would otherwise log a "Too Many Requests" warning
+            logging.getLogger("django.request").setLevel(logging.ERROR)
+            start = time.perf_counter()
+            for i in range(logins):
+                response = client.post("/login/", {"username": f"victim{i % 3}", "password": "wrong"})
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"\nCredential-stuffing burst: {logins} bad logins from one IP in "
+                f"{elapsed:.2f}s, responses {dict(sorted(statuses.items()))} "
+                f"(limits: {settings.RATELIMITS['login']})"
+            )
@@ -0,0 +1,67 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.benchmarking import measure, test_database
+from main.models import Location, Membership, MembershipPeriod
+from main.reports import REPORTS
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every report (uncached) over several years of generated "
+        "membership history. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--members", type=int, default=20_000)
+        parser.add_argument("--years", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with test_database():
+            periods = self._populate(options["members"], options["years"])
+            self.stdout.write(f"{options['members']} members, {periods} periods")
+            self.stdout.write(f"{'report':<12}{'ms':>10}{'queries':>10}")
+            for name, report in REPORTS.items():
+                stats = measure(report, runs=3)
+                self.stdout.write(f"{name:<12}{stats['median_ms']:>10.1f}{stats['queries']:>10.0f}")
+
+    @transaction.atomic
+    def _populate(self, count, years):
+        rng = random.Random(42)
+        location = Location.objects.get_or_create(slug="bench", defaults={"name": "Bench", "city": "Mendoza"})[0]
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(username=f"member{i}") for i in range(count)
+        ], batch_size=1000)
+        first_day = date.today() - timedelta(days=365 * years)
+        plans = [code for code, _ in Membership.PLAN_CHOICES]
+
+        memberships, history = [], []
+        for user in users:
+            start = first_day + timedelta(days=rng.randrange(365 * years))
+            plan, duration = rng.choice(plans), rng.choice((30, 90, 365))
+            terms = 1 + int(rng.expovariate(1 / 3))  # how many times they pay
+            history.append([(start + timedelta(days=duration * n), duration, plan) for n in range(terms)])
+            memberships.append(Membership(
+                user=user, location=location, plan_type=plan, duration_days=duration,
+                expires_on=start + timedelta(days=duration * terms),
+            ))
+        Membership.objects.bulk_create(memberships, batch_size=1000)
+
+        periods = [
+            MembershipPeriod(
+                membership=membership,
+                kind="signup" if n == 0 else "renewal",
+                plan_type=plan,
+                start_date=start,
+                end_date=start + timedelta(days=duration),
+                duration_days=duration,
+            )
+            for membership, terms in zip(memberships, history)
+            for n, (start, duration, plan) in enumerate(terms)
+        ]
+        MembershipPeriod.objects.bulk_create(periods, batch_size=1000)
+        return len(periods)
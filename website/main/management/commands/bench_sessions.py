@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from main.benchmarking import measure, test_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-request cost of each SESSION_MODE on the login -> "
+        "member page flow. Runs against a throwaway test database, with the "
+        "configured cache: queries to a DatabaseCache count as session queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Authenticated requests per mode.")
+
+    def handle(self, *args, **options):
+        runs = options["requests"]
+        with test_database():
+            user = get_user_model().objects.create_user("bench", password="bench-pass-123")
+            # dashboard/home call the weather API; my-routines is the same
+            # login_required + profile flow without the network round trip
+            url = "/my-routines/"
+
+            self.stdout.write(f"{'mode':<16}{'median ms':>10}{'p95 ms':>10}{'session queries':>17}")
+            for mode, engine in settings.SESSION_ENGINES.items():
+                with override_settings(SESSION_ENGINE=engine, PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]):
+                    user.set_password("bench-pass-123")
+                    user.save()
+                    client = Client()
+                    client.post("/login/", {"username": "bench", "password": "bench-pass-123"})
+                    stats = measure(lambda: client.get(url), runs, query_filter=("django_session", "django_cache"))
+                self.stdout.write(
+                    f"{mode:<16}{stats['median_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['queries']:>17.2f}"
+                )
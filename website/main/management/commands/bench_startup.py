@@ -0,0 +1,62 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What a gunicorn worker does before it can serve its first request
+BOOT_SNIPPET = (
+    "from django.core.wsgi import get_wsgi_application;"
+    "get_wsgi_application();"
+    "import website.urls"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold-boot time of the WSGI app in fresh interpreters and list "
+        "the slowest imports reported by `python -X importtime`."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Number of cold boots to time.")
+        parser.add_argument("--top", type=int, default=15, help="How many imports to list.")
+
+    def _boot(self, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ["-X", "importtime"]
+        command += ["-c", BOOT_SNIPPET]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "website.settings")}
+        start = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        return (time.perf_counter() - start) * 1000, result.stderr
+
+    def handle(self, *args, **options):
+        timings = [self._boot()[0] for _ in range(options["runs"])]
+        self.stdout.write(
+            f"Cold boot over {len(timings)} runs: "
+            f"median {statistics.median(timings):.0f} ms, "
+            f"min {min(timings):.0f} ms, max {max(timings):.0f} ms"
+        )
+
+        # Top-level imports only (no indentation), sorted by cumulative time
+        _elapsed, report = self._boot(importtime=True)
+        imports = []
+        for line in report.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if not cumulative_us.strip().isdigit() or name.startswith("  "):
+                continue
+            imports.append((int(cumulative_us), name.strip()))
+
+        self.stdout.write("\nSlowest top-level imports (cumulative):")
+        for cumulative_us, name in sorted(imports, reverse=True)[:options["top"]]:
+            self.stdout.write(f"{cumulative_us / 1000:8.1f} ms  {name}")
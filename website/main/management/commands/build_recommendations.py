@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.recommendations import build_neighbors
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the routine similarity index behind 'Recommended for you' "
+        "from current enrollments. Meant to run from a scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, help="Neighbors kept per routine (default: RECOMMENDATION_TOP_K).")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = build_neighbors(top_k=options["top_k"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} routine neighbors in {elapsed:.1f}s."))
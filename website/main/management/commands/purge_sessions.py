@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions in small batches, so the purge never holds a "
+        "long lock on django_session. Meant to run from a scheduler "
+        "(e.g. Heroku Scheduler, daily): python manage.py purge_sessions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.SESSION_PURGE_BATCH_SIZE,
+            help="Rows deleted per statement.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0.0,
+            help="Seconds to sleep between batches, to go easy on a busy database.",
+        )
+
+    def handle(self, *args, **options):
+        if settings.SESSION_MODE == "signed_cookies":
+            self.stdout.write("Sessions are stored in signed cookies, nothing to purge.")
+            return
+
+        batch_size = options["batch_size"]
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        total = 0
+
+        while True:
+            keys = list(expired.values_list("session_key", flat=True)[:batch_size])
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired sessions."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from main.services import recount_routines
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the Routine.client_count and exercise_count counter "
+        "caches from the real rows, e.g. after a manual data fix."
+    )
+
+    def handle(self, *args, **options):
+        fixed = recount_routines()
+        if fixed:
+            self.stdout.write(self.style.WARNING(f"Fixed the counts of {fixed} routines."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All routine counts were correct."))
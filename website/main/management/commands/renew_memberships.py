@@ -0,0 +1,31 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.memberships import renew_expiring
+
+
+class Command(BaseCommand):
+    help = (
+        "Renew every auto-renewing membership that runs out by --through "
+        "(default: the end of this month). Meant to run from a scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--through", help="Renew memberships expiring up to this date (YYYY-MM-DD).")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["through"]:
+            try:
+                through = datetime.strptime(options["through"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--through must look like 2025-12-31")
+        else:
+            today = date.today()
+            # expires_on is the first day not covered, so "expires this month"
+            # means expires_on <= the 1st of next month
+            through = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+        renewed = renew_expiring(through, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Renewed {renewed} memberships expiring by {through}."))
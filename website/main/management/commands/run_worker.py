@@ -0,0 +1,66 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import tasks  # noqa: F401 - registers the task functions
+from main.queue import claim, prune, run
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (main.queue) on a thread pool until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.TASKS_CONCURRENCY,
+            help="Tasks run at the same time.",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=settings.TASKS_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit as soon as the queue is empty.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        stopping = threading.Event()
+        running = set()
+        lock = threading.Lock()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the running tasks finish...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def done(future):
+            with lock:
+                running.discard(future)
+
+        self.stdout.write(f"Worker started with {concurrency} threads.")
+        next_prune = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not stopping.is_set():
+                if time.monotonic() >= next_prune:
+                    prune()
+                    next_prune = time.monotonic() + settings.TASKS_PRUNE_INTERVAL
+                with lock:
+                    free = concurrency - len(running)
+                claimed = claim(free) if free else []
+                for task_row in claimed:
+                    future = pool.submit(run, task_row)
+                    with lock:
+                        running.add(future)
+                    future.add_done_callback(done)
+
+                if not claimed:
+                    with lock:
+                        idle = not running
+                    if options["once"] and idle:
+                        break
+                    stopping.wait(options["poll"])
+        self.stdout.write("Worker stopped.")
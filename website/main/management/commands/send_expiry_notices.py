@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.notifications import send_expiry_notices
+
+
+class Command(BaseCommand):
+    help = (
+        "Email members whose membership expires in N days (settings."
+        "MEMBERSHIP_EXPIRY_NOTICE_DAYS by default). Safe to run more than once "
+        "a day: members already notified for an expiry are skipped, and members "
+        "a failed or missed run didn't reach are notified the next time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, action="append",
+            help="Days before expiry; repeat for several notices. Default: %s" % (settings.MEMBERSHIP_EXPIRY_NOTICE_DAYS,),
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.NOTIFICATION_BATCH_SIZE)
+        parser.add_argument(
+            "--rate-limit", type=int, default=settings.NOTIFICATION_RATE_LIMIT,
+            help="Messages per second, 0 for no limit. Default: %(default)s",
+        )
+
+    def handle(self, *args, **options):
+        notice_days = sorted(options["days"] or settings.MEMBERSHIP_EXPIRY_NOTICE_DAYS)
+        for min_days, days in zip([0] + notice_days, notice_days):
+            # Each notice covers the days up to the next one, so a member
+            # who missed the 7-day notice still gets it until the 1-day one
+            totals = send_expiry_notices(
+                days, min_days=min_days, batch_size=options["batch_size"], rate_limit=options["rate_limit"],
+            )
+            self.stdout.write(f"{days} day(s) before expiry: {totals['sent']} sent, {totals['failed']} failed")
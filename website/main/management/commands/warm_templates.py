@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main.templating import warm_templates
+
+
+class Command(BaseCommand):
+    help = "Precompile every template of the main app and print how long each one took."
+
+    def handle(self, *args, **options):
+        timings = warm_templates()
+        for name, elapsed_ms in sorted(timings.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"{elapsed_ms:8.2f} ms  {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Precompiled {len(timings)} templates in {sum(timings.values()):.1f} ms"
+        ))
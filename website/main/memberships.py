@@ -0,0 +1,239 @@
+"""
+Membership lifecycle: sign up, renew, change plan, pause/resume.
+
+Every change is recorded as a MembershipPeriod ([start_date, end_date) in
+days) and the current state is copied onto the Membership row itself
+(plan_type, expires_on, paused_on, current_period), so reads never have to
+look at the history. plan_type and current_period follow the period running
+today; a renewal paid in advance only moves expires_on until it starts, and
+advance_periods() (`manage.py advance_memberships`, daily) switches to it.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .archive import restore_member
+from .models import Membership, MembershipPeriod
+
+
+def _running(today):
+    """
+    The periods of the outer membership that started by ``today``, latest
+    first: the first one is running today, or was the last to run.
+    """
+    return (
+        MembershipPeriod.objects
+        .filter(membership=OuterRef('pk'), start_date__lte=today)
+        .exclude(kind='pause')
+        .order_by('-start_date', '-id')
+    )
+
+
+def _sync(membership):
+    """Copy the period history onto the membership."""
+    periods = membership.periods.exclude(kind='pause')
+    latest = periods.order_by('-end_date', '-id').first()
+    current = periods.filter(start_date__lte=date.today()).order_by('-start_date', '-id').first() or latest
+    membership.current_period = current
+    membership.plan_type = current.plan_type
+    membership.expires_on = latest.end_date
+    membership.is_active = True
+    membership.save()
+
+
+@transaction.atomic
+def start_membership(user, location, plan_type, duration_days, auto_renew=False):
+    today = date.today()
+    restore_member(user)
+    membership = Membership.objects.create(
+        user=user,
+        location=location,
+        plan_type=plan_type,
+        duration_days=duration_days,
+        auto_renew=auto_renew,
+        expires_on=today + timedelta(days=duration_days),
+    )
+    MembershipPeriod.objects.create(
+        membership=membership,
+        kind='signup',
+        plan_type=plan_type,
+        start_date=today,
+        end_date=membership.expires_on,
+        duration_days=duration_days,
+    )
+    _sync(membership)
+    return membership
+
+
+@transaction.atomic
+def renew(membership, duration_days, plan_type=None):
+    """
+    Add ``duration_days`` after the current expiry, or from today if the
+    membership already lapsed. A new ``plan_type`` applies from the day the
+    renewal starts.
+    """
+    start = max(membership.expires_on or date.today(), date.today())
+    period = MembershipPeriod.objects.create(
+        membership=membership,
+        kind='renewal',
+        plan_type=plan_type or membership.plan_type,
+        start_date=start,
+        end_date=start + timedelta(days=duration_days),
+        duration_days=duration_days,
+    )
+    membership.duration_days = duration_days
+    _sync(membership)
+    return period
+
+
+@transaction.atomic
+def change_plan(membership, plan_type):
+    """
+    Switch plan from today on. The period running today is split in two and
+    every period already paid for after today moves to the new plan.
+    """
+    today = date.today()
+    running = membership.periods.filter(start_date__lte=today, end_date__gt=today).first()
+    if running is None:
+        raise ValueError("This membership is not running today.")
+
+    if running.start_date == today:
+        running.plan_type = plan_type
+        running.save(update_fields=['plan_type'])
+    else:
+        MembershipPeriod.objects.create(
+            membership=membership,
+            kind='plan_change',
+            plan_type=plan_type,
+            start_date=today,
+            end_date=running.end_date,
+            duration_days=running.duration_days,
+        )
+        running.end_date = today
+        running.save(update_fields=['end_date'])
+
+    membership.periods.filter(start_date__gt=today).update(plan_type=plan_type)
+    _sync(membership)
+
+
+@transaction.atomic
+def pause(membership):
+    if membership.paused_on is not None:
+        return
+    membership.paused_on = date.today()
+    membership.save(update_fields=['paused_on', 'updated_at'])
+
+
+@transaction.atomic
+def resume(membership):
+    """
+    End a pause: the days spent paused are recorded as a 'pause' period and
+    every day that was still left is pushed back by the same amount.
+    """
+    paused_on = membership.paused_on
+    if paused_on is None:
+        return
+    today = date.today()
+    shift = today - paused_on
+    membership.paused_on = None
+
+    if shift.days > 0:
+        periods = list(membership.periods.filter(end_date__gt=paused_on).exclude(kind='pause'))
+        for period in periods:
+            if period.start_date < paused_on:
+                # Split the period that was running when the pause started
+                MembershipPeriod.objects.create(
+                    membership=membership,
+                    kind=period.kind,
+                    plan_type=period.plan_type,
+                    start_date=today,
+                    end_date=period.end_date + shift,
+                    duration_days=period.duration_days,
+                )
+                period.end_date = paused_on
+            else:
+                period.start_date += shift
+                period.end_date += shift
+        MembershipPeriod.objects.bulk_update(periods, ['start_date', 'end_date'])
+        MembershipPeriod.objects.create(
+            membership=membership,
+            kind='pause',
+            plan_type=membership.plan_type,
+            start_date=paused_on,
+            end_date=today,
+        )
+
+    _sync(membership)
+
+
+def renew_expiring(through_date, batch_size=2000):
+    """
+    Month-end batch: renew every auto-renewing membership that expires on or
+    before ``through_date`` for another ``duration_days``.
+
+    Works in batches with a fixed number of statements each: one SELECT of the
+    due rows, one bulk INSERT of the new periods and one UPDATE that moves the
+    expiry (and the current period, for memberships that had already lapsed).
+    Returns how many were renewed.
+    """
+    today = date.today()
+    due = (
+        Membership.objects
+        .filter(auto_renew=True, is_active=True, paused_on__isnull=True, expires_on__lte=through_date)
+        .order_by('pk')
+    )
+    latest_period = MembershipPeriod.objects.filter(membership=OuterRef('pk')).order_by('-end_date', '-id')
+    running = _running(today)
+    renewed = 0
+    last_pk = 0
+
+    while True:
+        rows = list(
+            due.filter(pk__gt=last_pk)
+            .values_list('pk', 'plan_type', 'duration_days', 'expires_on')[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        with transaction.atomic():
+            periods = []
+            for pk, plan_type, duration_days, expires_on in rows:
+                start = max(expires_on, today)
+                periods.append(MembershipPeriod(
+                    membership_id=pk,
+                    kind='renewal',
+                    plan_type=plan_type,
+                    start_date=start,
+                    end_date=start + timedelta(days=duration_days),
+                    duration_days=duration_days,
+                ))
+            MembershipPeriod.objects.bulk_create(periods)
+            renewed += Membership.objects.filter(pk__in=[row[0] for row in rows]).update(
+                expires_on=Subquery(latest_period.values('end_date')[:1]),
+                current_period=Subquery(running.values('pk')[:1]),
+                plan_type=Subquery(running.values('plan_type')[:1]),
+                updated_at=timezone.now(),
+            )
+
+    return renewed
+
+
+def advance_periods(today=None):
+    """
+    Daily: move memberships whose current period is over onto the renewal
+    that has started since. One UPDATE; returns how many moved.
+    """
+    today = today or date.today()
+    running = _running(today)
+    return (
+        Membership.objects
+        .filter(current_period__end_date__lte=today, expires_on__gt=today, paused_on__isnull=True)
+        .update(
+            current_period=Subquery(running.values('pk')[:1]),
+            plan_type=Subquery(running.values('plan_type')[:1]),
+            updated_at=timezone.now(),
+        )
+    )
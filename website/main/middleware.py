@@ -0,0 +1,57 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .locations import resolve_location
+from .profiling import MODES, profile_call, store
+
+
+class ProfilingMiddleware:
+    """
+    Profile a request (main/profiling.py) when an admin asks for it with
+    ``?profile=cprofile|sample`` or an ``X-Profile`` header, and a random
+    PROFILING_SAMPLE_RATE fraction of all requests. The id of the stored
+    profile comes back in the ``X-Profile`` response header.
+
+    Unless PROFILING_ENABLED, Django drops the middleware at startup, so it
+    costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = self._mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response, data = profile_call(mode, request.path, self.get_response, request)
+        if data is not None:
+            response["X-Profile"] = store(mode, request, time.perf_counter() - start, data).pk
+        return response
+
+    def _mode(self, request):
+        requested = request.GET.get("profile") or request.headers.get("X-Profile")
+        if requested:
+            user = request.user
+            is_admin = user.is_authenticated and hasattr(user, "profile") and user.profile.is_admin
+            return requested if is_admin and requested in MODES else None
+        if random.random() < settings.PROFILING_SAMPLE_RATE:
+            return settings.PROFILING_MODE
+        return None
+
+
+class LocationMiddleware:
+    """Set ``request.location`` (the gym branch) once per request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.location = resolve_location(request)
+        return self.get_response(request)
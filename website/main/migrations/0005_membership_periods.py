@@ -0,0 +1,82 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:43
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_periods(apps, schema_editor):
+    """Give every existing membership its signup period and expiry date."""
+    Membership = apps.get_model('main', 'Membership')
+    MembershipPeriod = apps.get_model('main', 'MembershipPeriod')
+    for membership in Membership.objects.all().iterator():
+        end_date = membership.start_date + timedelta(days=membership.duration_days)
+        period = MembershipPeriod.objects.create(
+            membership=membership,
+            kind='signup',
+            plan_type=membership.plan_type,
+            start_date=membership.start_date,
+            end_date=end_date,
+        )
+        Membership.objects.filter(pk=membership.pk).update(
+            expires_on=end_date, current_period=period
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_sync_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MembershipPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('signup', 'Sign up'), ('renewal', 'Renewal'), ('plan_change', 'Plan change'), ('pause', 'Pause')], default='signup', max_length=20)),
+                ('plan_type', models.CharField(choices=[('basic', 'Basic Plan'), ('premium', 'Premium Plan'), ('vip', 'VIP Plan')], max_length=20)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['start_date', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='auto_renew',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='expires_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='paused_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['expires_on', 'is_active'], name='membership_expires_idx'),
+        ),
+        migrations.AddField(
+            model_name='membershipperiod',
+            name='membership',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periods', to='main.membership'),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='current_period',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.membershipperiod'),
+        ),
+        migrations.AddIndex(
+            model_name='membershipperiod',
+            index=models.Index(fields=['membership', 'end_date'], name='period_membership_end_idx'),
+        ),
+        migrations.RunPython(backfill_periods, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_membership_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('expires_on', models.DateField()),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed')], default='sent', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('sent_at', models.DateTimeField(auto_now=True)),
+                ('membership', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='main.membership')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='notificationlog',
+            constraint=models.UniqueConstraint(fields=('membership', 'kind', 'expires_on'), name='unique_notification_per_expiry'),
+        ),
+    ]
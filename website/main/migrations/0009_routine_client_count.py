@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_client_count(apps, schema_editor):
+    Routine = apps.get_model('main', 'Routine')
+    Enrollment = Routine.clients.through
+    enrolled = (
+        Enrollment.objects.filter(routine_id=OuterRef('pk'))
+        .values('routine_id')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Routine.objects.update(client_count=Coalesce(Subquery(enrolled), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_member_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routine',
+            name='client_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_client_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_exercise_count(apps, schema_editor):
+    Routine = apps.get_model('main', 'Routine')
+    Exercise = apps.get_model('main', 'Exercise')
+    exercises = (
+        Exercise.objects.filter(routine_id=OuterRef('pk'))
+        .values('routine_id')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Routine.objects.update(exercise_count=Coalesce(Subquery(exercises), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_routine_client_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routine',
+            name='exercise_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_exercise_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_default_location(apps, schema_editor):
+    """Everything so far belonged to the one Mendoza gym."""
+    Location = apps.get_model('main', 'Location')
+    location, _ = Location.objects.get_or_create(
+        slug='mendoza', defaults={'name': 'Mendoza', 'city': 'Mendoza'}
+    )
+    for name in ('Instructor', 'Membership', 'Routine'):
+        model = apps.get_model('main', name)
+        model.objects.filter(location__isnull=True).update(location=location)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_routine_exercise_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('city', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedmembership',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main.location'),
+        ),
+        migrations.AddField(
+            model_name='instructor',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='instructors', to='main.location'),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='memberships', to='main.location'),
+        ),
+        migrations.AddField(
+            model_name='routine',
+            name='location',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='routines', to='main.location'),
+        ),
+        migrations.RunPython(assign_default_location, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_locations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='instructor',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='instructors', to='main.location'),
+        ),
+        migrations.AlterField(
+            model_name='membership',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='memberships', to='main.location'),
+        ),
+        migrations.AlterField(
+            model_name='routine',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='routines', to='main.location'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(fields=['location', 'specialty'], name='instructor_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['location', 'expires_on'], name='membership_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='routine',
+            index=models.Index(fields=['location', 'name'], name='routine_location_idx'),
+        ),
+    ]
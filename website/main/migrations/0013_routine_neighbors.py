@@ -0,0 +1,30 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_locations_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoutineNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.routine')),
+                ('routine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='main.routine')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['routine', '-score'], name='neighbor_routine_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routineneighbor',
+            constraint=models.UniqueConstraint(fields=('routine', 'neighbor'), name='unique_routine_neighbor'),
+        ),
+    ]
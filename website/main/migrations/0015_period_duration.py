@@ -0,0 +1,40 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:28
+
+from django.db import migrations, models
+
+
+def backfill_duration(apps, schema_editor):
+    # Signups and renewals start out covering the whole plan. Plan changes
+    # (and periods already split by a pause) only hold what was left of it,
+    # so they take the plan length from their membership.
+    for name in ('MembershipPeriod', 'ArchivedMembershipPeriod'):
+        Period = apps.get_model('main', name)
+        periods = []
+        for period in Period.objects.exclude(kind='pause').select_related('membership').iterator():
+            if period.kind == 'plan_change':
+                period.duration_days = period.membership.duration_days
+            else:
+                period.duration_days = (period.end_date - period.start_date).days
+            periods.append(period)
+        Period.objects.bulk_update(periods, ['duration_days'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_request_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedmembershipperiod',
+            name='duration_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='membershipperiod',
+            name='duration_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_duration, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-19 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_period_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='user_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,18 +1,60 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from datetime import date, timedelta
 
 # Create your models here.
 
+class Location(models.Model):
+    """A gym branch. Instructors, routines and memberships belong to one."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+    city = models.CharField(max_length=100)  # used for the weather widget
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class LocationQuerySet(models.QuerySet):
+    def for_location(self, location):
+        """Only the rows of one branch (see main/locations.py)."""
+        return self.filter(location=location)
+
+
 class Instructor(models.Model):
     """Model for fitness instructors/personal trainers"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='instructor_profile')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='instructors')
     specialty = models.CharField(max_length=100)  # e.g., "Yoga", "Pilates", "Functional"
     bio = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = LocationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'specialty'], name='instructor_location_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.specialty}"
 
+class MembershipQuerySet(LocationQuerySet):
+    def active_on(self, day=None):
+        """Memberships that can use the gym on ``day`` (today by default)."""
+        return self.filter(
+            is_active=True,
+            paused_on__isnull=True,
+            expires_on__gt=day or date.today(),
+        )
+
+
 class Membership(models.Model):
     """Membership plans and user memberships"""
     PLAN_CHOICES = [
@@ -22,13 +64,41 @@ class Membership(models.Model):
     ]
     
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='membership')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='memberships')
     plan_type = models.CharField(max_length=20, choices=PLAN_CHOICES, default='basic')
     start_date = models.DateField(auto_now_add=True)
     duration_days = models.IntegerField(default=30)  # 30, 90, 365 days
     is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Denormalized from the period history (MembershipPeriod), kept in sync by
+    # main/memberships.py so "is this member active today" is a single row read.
+    expires_on = models.DateField(null=True, blank=True)  # first day NOT covered
+    paused_on = models.DateField(null=True, blank=True)
+    auto_renew = models.BooleanField(default=False)
+    current_period = models.ForeignKey(
+        'MembershipPeriod',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    objects = MembershipQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # month-end renewals and expiry lookups
+            models.Index(fields=['expires_on', 'is_active'], name='membership_expires_idx'),
+            # per-branch member lists
+            models.Index(fields=['location', 'expires_on'], name='membership_location_idx'),
+        ]
     
     @property
     def expiration_date(self):
+        if self.expires_on:
+            return self.expires_on
         return self.start_date + timedelta(days=self.duration_days)
     
     @property
@@ -36,19 +106,55 @@ class Membership(models.Model):
         """Calculate days left in membership - for user dashboard"""
         if not self.is_active:
             return 0
-        today = date.today()
+        # Days don't run out while the membership is paused
+        today = self.paused_on or date.today()
         expiration = self.expiration_date
         days = (expiration - today).days
         return max(days, 0)  # Return 0 if expired
+
+    @property
+    def is_paused(self):
+        return self.paused_on is not None
     
     def __str__(self):
         return f"{self.user.username} - {self.plan_type} ({self.days_remaining} days remaining)"
 
+
+class MembershipPeriod(models.Model):
+    """One billed stretch of a membership: [start_date, end_date)"""
+    KIND_CHOICES = [
+        ('signup', 'Sign up'),
+        ('renewal', 'Renewal'),
+        ('plan_change', 'Plan change'),
+        ('pause', 'Pause'),
+    ]
+
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, related_name='periods')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='signup')
+    plan_type = models.CharField(max_length=20, choices=Membership.PLAN_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()  # first day NOT covered
+    # Length of the plan paid for (30, 90, 365), kept when the period is
+    # split by a plan change or a pause; None for pauses
+    duration_days = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['start_date', 'id']
+        indexes = [
+            models.Index(fields=['membership', 'end_date'], name='period_membership_end_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.membership.user.username} - {self.get_kind_display()} {self.plan_type} ({self.start_date} to {self.end_date})"
+
+
 class Routine(models.Model):
     """Workout routines (e.g., Yoga, Pilates, Functional training)"""
     name = models.CharField(max_length=100)  # e.g., "Yoga for Beginners"
     description = models.TextField()
     instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='routines')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='routines')
     duration_minutes = models.IntegerField(default=60)
 
     clients = models.ManyToManyField(
@@ -56,25 +162,233 @@ class Routine(models.Model):
         related_name='routines',
         blank=True
     )
+    # Counter caches for clients.count() and exercises.count(), kept current
+    # by main/signals.py and main/services.py; `manage.py recount` repairs them
+    client_count = models.PositiveIntegerField(default=0, editable=False)
+    exercise_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = LocationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location', 'name'], name='routine_location_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
+class RoutineNeighbor(models.Model):
+    """
+    One of the routines most often taken together with ``routine``, built
+    by `manage.py build_recommendations` (main/recommendations.py)
+    """
+    routine = models.ForeignKey(Routine, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Routine, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()  # cosine similarity of the two client sets
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['routine', 'neighbor'], name='unique_routine_neighbor'),
+        ]
+        indexes = [
+            models.Index(fields=['routine', '-score'], name='neighbor_routine_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.routine_id} -> {self.neighbor_id} ({self.score:.2f})"
+
+
+class ExerciseQuerySet(models.QuerySet):
+    def for_location(self, location):
+        """Only the exercises of one branch's routines."""
+        return self.filter(routine__location=location)
+
+
 class Exercise(models.Model):
     """Individual exercises/classes within a routine"""
     routine = models.ForeignKey(Routine, related_name='exercises', on_delete=models.CASCADE)
     name = models.CharField(max_length=100)  # e.g., "Warrior Pose"
     description = models.TextField()
     repetitions = models.CharField(max_length=50, blank=True, null=True)  # e.g., "3 sets of 10"
-    
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ExerciseQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.routine.name})"
 
+class UnarchivedManager(models.Manager):
+    """Default manager that hides archived rows (see main/archive.py)"""
+    def get_queryset(self):
+        return super().get_queryset().filter(archived_at__isnull=True)
+
+
 class UserProfile(models.Model):
     """Extended user profile for both admins and regular users"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     phone = models.CharField(max_length=20, blank=True, null=True)
     is_admin = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Set when the member is archived; their membership and enrollments
+    # then live in the Archived* tables below.
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    objects = UnarchivedManager()
+    all_objects = models.Manager()
     
     def __str__(self):
-        return self.user.username
\ No newline at end of file
+        return self.user.username
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, so sync clients can drop it locally"""
+    model = models.CharField(max_length=50)  # e.g., "routine"
+    object_id = models.BigIntegerField()
+    # Owner of a deleted membership or profile: only they (and admins) see
+    # the tombstone in the change feed. Not a foreign key, the user may be gone.
+    user_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted at {self.deleted_at}"
+
+
+class NotificationLog(models.Model):
+    """One notice sent (or attempted) to a member; stops duplicate sends"""
+    STATUS_CHOICES = [
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    membership = models.ForeignKey(Membership, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=50)  # e.g., "expiring_7d"
+    expires_on = models.DateField()  # the expiry the notice was about
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='sent')
+    attempts = models.PositiveSmallIntegerField(default=1)
+    sent_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['membership', 'kind', 'expires_on'],
+                name='unique_notification_per_expiry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.membership.user.username} - {self.kind} ({self.status})"
+
+
+class Task(models.Model):
+    """Background job stored in the database and run by `manage.py run_worker`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)  # registered task name, e.g. "delete_user"
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # what the worker polls for: queued tasks that are due
+            models.Index(fields=['status', 'run_after'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# =========================
+# Archive (history of archived members, see main/archive.py)
+# =========================
+# Rows keep the id they had in the live table, and plain ids are used where
+# the live row may be hard-deleted later.
+
+class ArchivedMembership(models.Model):
+    """A membership moved out of main_membership when its member was archived"""
+    id = models.BigIntegerField(primary_key=True)  # Membership.id
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_memberships')
+    username = models.CharField(max_length=150)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    plan_type = models.CharField(max_length=20, choices=Membership.PLAN_CHOICES)
+    start_date = models.DateField()
+    duration_days = models.IntegerField()
+    expires_on = models.DateField(null=True, blank=True)
+    auto_renew = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.username} - {self.plan_type} (archived {self.archived_at:%Y-%m-%d})"
+
+
+class ArchivedMembershipPeriod(models.Model):
+    """A MembershipPeriod of an archived membership"""
+    id = models.BigIntegerField(primary_key=True)  # MembershipPeriod.id
+    membership = models.ForeignKey(ArchivedMembership, on_delete=models.CASCADE, related_name='periods')
+    kind = models.CharField(max_length=20, choices=MembershipPeriod.KIND_CHOICES)
+    plan_type = models.CharField(max_length=20, choices=Membership.PLAN_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    duration_days = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['start_date', 'id']
+
+    def __str__(self):
+        return f"{self.membership.username} - {self.get_kind_display()} {self.plan_type} ({self.start_date} to {self.end_date})"
+
+
+class ArchivedEnrollment(models.Model):
+    """A routine an archived member was enrolled in"""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_enrollments')
+    username = models.CharField(max_length=150)
+    routine_id = models.BigIntegerField(db_index=True)  # the routine may be deleted later
+    routine_name = models.CharField(max_length=100)
+    archived_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.username} - {self.routine_name}"
+
+
+class RequestProfile(models.Model):
+    """A profile of one request, captured by main.middleware.ProfilingMiddleware"""
+    MODE_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('sample', 'Sampling'),
+    ]
+    EXTENSIONS = {'cprofile': '.pstats', 'sample': '.speedscope.json'}
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES)
+    duration_ms = models.PositiveIntegerField()
+    data = models.BinaryField()  # pstats (marshal) or speedscope JSON
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    @property
+    def filename(self):
+        return f"profile-{self.pk}-{self.created_at:%Y%m%d-%H%M%S}{self.EXTENSIONS[self.mode]}"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms} ms, {self.mode})"
@@ -0,0 +1,172 @@
+"""
+Notices for memberships that are about to expire.
+
+    send_expiry_notices(days_before=7)
+
+selects the memberships expiring within ``days_before`` days (and after
+``min_days``, the next notice) with one indexed query per batch (keyset
+pagination, so memory stays flat however many members there are), skips
+the ones already notified for that expiry (NotificationLog), renders the
+message templates and hands them to the configured backend one by one. A
+message that fails is retried with backoff; if it still fails it is logged
+as 'failed', and the next run picks it up again, as it does members a
+missed run never got to.
+"""
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils.module_loading import import_string
+
+from .models import Membership, NotificationLog
+
+logger = logging.getLogger(__name__)
+
+
+class EmailNotificationBackend:
+    """
+    Delivers through Django's email framework, so EMAIL_BACKEND decides where
+    messages go: SMTP in production, console/file/locmem in development and tests.
+    """
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def reset(self):
+        """Start over with a fresh connection after a failed send."""
+        try:
+            self.close()
+        except Exception:
+            pass
+        self.open()
+
+    def send(self, recipient, subject, body):
+        """Send one message. Raises on failure."""
+        EmailMessage(subject, body, to=[recipient], connection=self.connection).send()
+
+
+def get_backend():
+    return import_string(settings.NOTIFICATION_BACKEND)()
+
+
+class RateLimiter:
+    """Blocks so that no more than ``per_second`` messages go out on average."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0
+        self.next_slot = time.monotonic()
+
+    def wait(self, count):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_slot > now:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(self.next_slot, now) + count * self.interval
+
+
+def _render(membership, today):
+    context = {
+        "user": membership.user,
+        "membership": membership,
+        "days_before": (membership.expires_on - today).days,
+        # expires_on is the first day not covered
+        "last_day": membership.expires_on - timedelta(days=1),
+    }
+    subject = render_to_string("main/emails/membership_expiring_subject.txt", context).strip()
+    body = render_to_string("main/emails/membership_expiring_body.txt", context)
+    return membership.user.email, subject, body
+
+
+def _send_with_retries(backend, notice):
+    retries = settings.NOTIFICATION_MAX_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            backend.send(*notice)
+            return True
+        except Exception:
+            if attempt == retries:
+                logger.exception("Giving up on the notice to %s", notice[0])
+                return False
+            delay = settings.NOTIFICATION_RETRY_BACKOFF * 2 ** attempt
+            logger.warning("Notice to %s failed, retrying in %.1fs", notice[0], delay)
+            time.sleep(delay)
+            backend.reset()
+
+
+def send_expiry_notices(days_before, min_days=0, today=None, batch_size=None, backend=None, rate_limit=None):
+    """
+    Notify memberships expiring in more than ``min_days`` and at most
+    ``days_before`` days, at most ``rate_limit`` messages a second
+    (NOTIFICATION_RATE_LIMIT by default, 0 for no limit). Returns a dict with
+    how many notices were sent and how many failed.
+    """
+    today = today or date.today()
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    backend = backend or get_backend()
+    limiter = RateLimiter(settings.NOTIFICATION_RATE_LIMIT if rate_limit is None else rate_limit)
+    kind = f"expiring_{days_before}d"
+
+    already_sent = NotificationLog.objects.filter(
+        membership=OuterRef("pk"), kind=kind, expires_on=OuterRef("expires_on"), status="sent"
+    )
+    due = (
+        Membership.objects
+        .active_on(today + timedelta(days=min_days))
+        .filter(expires_on__lte=today + timedelta(days=days_before))
+        .filter(user__is_active=True)
+        .exclude(user__email="")
+        .exclude(Exists(already_sent))
+        .select_related("user")
+        .order_by("pk")
+    )
+
+    totals = {"sent": 0, "failed": 0}
+    last_pk = 0
+    backend.open()
+    try:
+        while True:
+            batch = list(due.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            statuses = {}
+            for m in batch:
+                limiter.wait(1)
+                statuses[m.pk] = "sent" if _send_with_retries(backend, _render(m, today)) else "failed"
+                totals[statuses[m.pk]] += 1
+
+            previous_attempts = {
+                (membership_id, expires_on): attempts
+                for membership_id, expires_on, attempts in NotificationLog.objects.filter(
+                    membership__in=batch, kind=kind
+                ).values_list("membership_id", "expires_on", "attempts")
+            }
+            NotificationLog.objects.bulk_create(
+                [
+                    NotificationLog(
+                        membership=m,
+                        kind=kind,
+                        expires_on=m.expires_on,
+                        status=statuses[m.pk],
+                        attempts=previous_attempts.get((m.pk, m.expires_on), 0) + 1,
+                    )
+                    for m in batch
+                ],
+                update_conflicts=True,
+                unique_fields=["membership", "kind", "expires_on"],
+                update_fields=["status", "attempts", "sent_at"],
+            )
+    finally:
+        backend.close()
+
+    return totals
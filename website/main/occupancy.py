@@ -0,0 +1,148 @@
+"""
+Live routine occupancy (Routine.client_count) for the client routine page,
+pushed to browsers as server-sent events by views.occupancy_events.
+
+Each connection subscribes to the hub for its branch. Changes reach the hub
+in one of two ways (OCCUPANCY_BACKEND):
+
+- "memory": toggle_routine_enrollment publishes the new counts once the
+  enrollment commits. Only works when everything runs in one process.
+- "poll": one poller per process reads the routines whose updated_at moved
+  (the enrollment signals bump it) every OCCUPANCY_POLL_INTERVAL seconds
+  and fans the changes out, so enrollments made by other workers show up
+  too. Every connection shares that single query.
+
+Streams only exist under ASGI (website/asgi.py). Under WSGI the endpoint
+sends the current counts and tells the browser when to reconnect.
+"""
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Routine
+
+
+def counts_for_location(location_id):
+    """{routine id: client count} for one branch, shared through the cache."""
+    return cache.get_or_set(
+        f"occupancy:{location_id}",
+        lambda: dict(
+            Routine.objects.for_location(location_id).values_list("pk", "client_count")
+        ),
+        settings.OCCUPANCY_POLL_INTERVAL,
+    )
+
+
+def event(data, name="occupancy"):
+    """One server-sent event; ``data`` maps routine ids to counts."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class Hub:
+    """Fan-out of count changes to the connections of each branch."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # asyncio.Queue -> (event loop, location id)
+        self._poller = None
+
+    def subscribe(self, location_id):
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers[queue] = (asyncio.get_running_loop(), location_id)
+            if settings.OCCUPANCY_BACKEND == "poll" and (self._poller is None or self._poller.done()):
+                self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish(self, changes):
+        """
+        ``changes`` is a list of (location id, routine id, count). Safe to
+        call from any thread.
+        """
+        by_location = {}
+        for location_id, routine_id, count in changes:
+            by_location.setdefault(location_id, {})[routine_id] = count
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, (loop, location_id) in subscribers:
+            if location_id in by_location:
+                loop.call_soon_threadsafe(queue.put_nowait, by_location[location_id])
+
+    async def _poll(self):
+        cursor, published = timezone.now(), {}
+        while True:
+            await asyncio.sleep(settings.OCCUPANCY_POLL_INTERVAL)
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            cursor, changes = await sync_to_async(_changed_since)(cursor, published)
+            if changes:
+                self.publish(changes)
+
+
+def _changed_since(cursor, published):
+    """
+    (next cursor, changes) for the routines updated after ``cursor``.
+
+    As in the sync feed, updated_at is set before the transaction commits,
+    so the next cursor stays SYNC_CURSOR_MARGIN seconds behind and the last
+    rows are read again; ``published`` ({routine id: count}, updated here)
+    drops the ones whose count browsers already have.
+    """
+    next_cursor = timezone.now() - timedelta(seconds=settings.SYNC_CURSOR_MARGIN)
+    changes = []
+    for location_id, routine_id, count in (
+        Routine.objects.filter(updated_at__gt=cursor)
+        .values_list("location_id", "pk", "client_count")
+    ):
+        if published.get(routine_id) != count:
+            published[routine_id] = count
+            changes.append((location_id, routine_id, count))
+    return next_cursor, changes
+
+
+hub = Hub()
+
+
+def publish_routines(routine_ids):
+    """Push the current counts of ``routine_ids`` (OCCUPANCY_BACKEND "memory")."""
+    if settings.OCCUPANCY_BACKEND != "memory":
+        return
+    hub.publish(list(
+        Routine.objects.filter(pk__in=routine_ids).values_list("location_id", "pk", "client_count")
+    ))
+
+
+async def stream(location_id, snapshot):
+    """
+    Event stream for one connection: the current counts, then every change,
+    with a comment as keep-alive. Ends after OCCUPANCY_STREAM_SECONDS and
+    the browser reconnects; Django 4.2 doesn't notice a client that went
+    away, so streams must not live forever.
+    """
+    queue = hub.subscribe(location_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.OCCUPANCY_STREAM_SECONDS
+    try:
+        yield f"retry: {settings.OCCUPANCY_RETRY_MS}\n\n"
+        yield event(snapshot)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                changes = await asyncio.wait_for(queue.get(), timeout=min(remaining, 15))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield event(changes)
+    finally:
+        hub.unsubscribe(queue)
@@ -0,0 +1,138 @@
+"""
+Per-request profiling for production, see ProfilingMiddleware.
+
+Two profilers:
+    - "cprofile": deterministic, every call counted. Saved in pstats format
+      (python -m pstats, snakeviz).
+    - "sample": a thread that reads the request thread's stack every
+      PROFILING_INTERVAL seconds, like py-spy. Much cheaper on hot code.
+      Saved as speedscope JSON (https://www.speedscope.app).
+
+Profiles are stored in the database (RequestProfile), so every web process
+sees them and they survive restarts. Only the newest PROFILING_KEEP are
+kept, and admins download them from the admin panel.
+"""
+import cProfile
+import json
+import marshal
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from .models import RequestProfile
+
+MODES = [mode for mode, _ in RequestProfile.MODE_CHOICES]
+
+# cProfile hooks the whole interpreter on Python 3.12 (sys.monitoring), so
+# only one request per process can be under it at a time
+_cprofile_lock = threading.Lock()
+
+
+class Sampler:
+    """Collects the stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = {}  # (function, file, line) -> index
+        self.samples = []  # (stack of frame indexes, root first; seconds)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples.append((self._stack(frame), now - last))
+            last = now
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            stack.append(self.frames.setdefault(key, len(self.frames)))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def speedscope(self, name):
+        """The samples in speedscope's file format."""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "main.profiling",
+            "shared": {
+                "frames": [
+                    {"name": function, "file": filename, "line": line}
+                    for function, filename, line in self.frames
+                ],
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weight for _, weight in self.samples),
+                "samples": [stack for stack, _ in self.samples],
+                "weights": [weight for _, weight in self.samples],
+            }],
+        }
+
+
+def profile_call(mode, name, func, *args):
+    """
+    Run ``func(*args)`` under the ``mode`` profiler. Returns (result, data)
+    with the profile as bytes, or None when it couldn't be profiled because
+    another request holds cProfile.
+    """
+    if mode == "cprofile":
+        if not _cprofile_lock.acquire(blocking=False):
+            return func(*args), None
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiling tool is active
+                return func(*args), None
+            try:
+                result = func(*args)
+            finally:
+                profiler.disable()
+        finally:
+            _cprofile_lock.release()
+        profiler.create_stats()
+        return result, marshal.dumps(profiler.stats)
+
+    sampler = Sampler(threading.get_ident(), settings.PROFILING_INTERVAL)
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        sampler.stop()
+    return result, json.dumps(sampler.speedscope(name)).encode()
+
+
+def store(mode, request, elapsed, data):
+    """Save a finished profile and drop the oldest. Returns the RequestProfile."""
+    profile = RequestProfile.objects.create(
+        method=request.method,
+        path=request.path[:255],
+        mode=mode,
+        duration_ms=round(elapsed * 1000),
+        data=data,
+    )
+    old = RequestProfile.objects.values_list("pk", flat=True)[settings.PROFILING_KEEP:]
+    RequestProfile.objects.filter(pk__in=list(old)).delete()
+    return profile
@@ -0,0 +1,123 @@
+"""
+Lightweight task queue backed by the Task table, no broker needed.
+
+    from main.queue import enqueue
+    enqueue("delete_user", user.pk)
+
+Functions become tasks with the ``@task`` decorator (see main/tasks.py).
+`manage.py run_worker` claims due tasks and runs them on a thread pool;
+a task that raises, or whose worker dies, is retried with exponential
+backoff until it runs out of attempts. Finished tasks are pruned after
+TASKS_KEEP_DAYS. With settings.TASKS_EAGER (the default when DEBUG is on) tasks run
+inline instead, so development needs no worker process.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(func):
+    """Register ``func`` under its own name so it can be enqueued."""
+    registry[func.__name__] = func
+    return func
+
+
+def enqueue(name, *args, max_attempts=None, delay=0, **kwargs):
+    """
+    Queue ``registry[name](*args, **kwargs)``. Arguments must be
+    JSON-serializable (pass ids, not model instances).
+    """
+    if name not in registry:
+        raise KeyError(f"Unknown task: {name}")
+    if settings.TASKS_EAGER:
+        registry[name](*args, **kwargs)
+        return None
+
+    task_row = Task(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    # Only queue it if the surrounding transaction commits, so the worker
+    # never sees a task for rows that were rolled back.
+    transaction.on_commit(task_row.save)
+    return task_row
+
+
+def claim(limit):
+    """
+    Mark up to ``limit`` due tasks as running and return them.
+
+    Tasks stuck in 'running' for longer than TASKS_LOCK_TIMEOUT (their worker
+    died) count as a failed attempt: they are queued again, or failed once
+    out of attempts, so a task that kills its worker can't loop forever.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status='running', locked_at__lt=now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    )
+    died = {'attempts': F('attempts') + 1, 'locked_at': None, 'last_error': 'Worker died', 'updated_at': now}
+    stale.filter(attempts__lt=F('max_attempts') - 1).update(status='queued', **died)
+    stale.update(status='failed', **died)
+
+    with transaction.atomic():
+        # skip_locked lets several workers poll at once on PostgreSQL; SQLite
+        # has no row locks and ignores select_for_update() entirely.
+        candidates = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        claimed = []
+        for pk in candidates:
+            # Conditional update: only one worker can win each task
+            if Task.objects.filter(pk=pk, status='queued').update(status='running', locked_at=now):
+                claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def run(task_row):
+    """Run one claimed task and record the outcome. Called from worker threads."""
+    close_old_connections()
+    try:
+        task_row.attempts += 1
+        try:
+            registry[task_row.name](*task_row.args, **task_row.kwargs)
+        except Exception:
+            task_row.last_error = traceback.format_exc()
+            if task_row.attempts < task_row.max_attempts:
+                backoff = settings.TASKS_RETRY_BACKOFF * 2 ** (task_row.attempts - 1)
+                task_row.status = 'queued'
+                task_row.run_after = timezone.now() + timedelta(seconds=backoff)
+                logger.warning("Task %s failed, retry %d in %ss", task_row, task_row.attempts, backoff)
+            else:
+                task_row.status = 'failed'
+                logger.error("Task %s failed for good:\n%s", task_row, task_row.last_error)
+        else:
+            task_row.status = 'done'
+            task_row.last_error = ''
+        task_row.locked_at = None
+        task_row.save(update_fields=['status', 'attempts', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+    finally:
+        close_old_connections()
+
+
+def prune():
+    """Delete tasks that finished more than TASKS_KEEP_DAYS ago. Returns how many."""
+    cutoff = timezone.now() - timedelta(days=settings.TASKS_KEEP_DAYS)
+    deleted, _ = Task.objects.filter(status__in=['done', 'failed'], updated_at__lt=cutoff).delete()
+    return deleted
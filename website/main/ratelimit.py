@@ -0,0 +1,75 @@
+"""
+Cache-backed sliding-window rate limiting for the login and register views.
+
+Each key keeps two counters, the current and the previous fixed window. The
+estimated number of hits in the last ``window`` seconds is
+
+    current + previous * (portion of the previous window still in range)
+
+which smooths out the burst a plain fixed window allows at its boundary,
+with only two cache keys per limit. Counters use cache.add()/incr(), which
+are atomic on Redis; the database cache (the production fallback) can miss
+a hit when two land at the same moment.
+
+The counters must live in a cache all web workers share, or each worker
+enforces the limit on its own (`manage.py check --deploy` warns, main.W001).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def client_ip(request):
+    if getattr(settings, "RATELIMIT_USE_X_FORWARDED_FOR", False):
+        # The proxy (e.g. the Heroku router) appends the address it saw last;
+        # anything before it was sent by the client and can be forged.
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def hit(key, limit, window):
+    """Count one hit for ``key``. Returns True when it is over ``limit``."""
+    now = time.time()
+    current_window = int(now // window)
+    elapsed = (now % window) / window
+
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    current_key = f"rl:{digest}:{current_window}"
+    previous_key = f"rl:{digest}:{current_window - 1}"
+
+    # Keep each counter for two windows, so it can still act as "previous"
+    cache.add(current_key, 0, timeout=window * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(current_key, 1, timeout=window * 2)
+        current = 1
+    previous = cache.get(previous_key, 0)
+
+    return current + previous * (1 - elapsed) > limit
+
+
+def is_rate_limited(request, scope):
+    """
+    Record an attempt on ``scope`` ("login", "register") and check every
+    limit configured for it in settings.RATELIMITS, by client IP and by the
+    submitted username.
+    """
+    limits = settings.RATELIMITS.get(scope, {})
+    identities = {
+        "ip": client_ip(request),
+        "username": request.POST.get("username", "").strip().lower(),
+    }
+    limited = False
+    for identity, (limit, window) in limits.items():
+        value = identities.get(identity)
+        if not value:
+            continue
+        # Check every limit, so each counter sees the attempt
+        limited |= hit(f"{scope}:{identity}:{value}", limit, window)
+    return limited
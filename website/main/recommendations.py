@@ -0,0 +1,87 @@
+"""
+"Recommended for you" on the client routine page, from co-enrollment.
+
+Two routines are similar when the same clients take both: the score is the
+cosine similarity of their client sets, co-enrolled / sqrt(n_a * n_b), with
+n from the Routine.client_count counter cache. `manage.py
+build_recommendations` computes it offline and keeps the top
+RECOMMENDATION_TOP_K neighbors of every routine in RoutineNeighbor, so a
+request only reads the neighbor rows of the routines the client already
+takes, through the (routine, -score) index.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Routine, RoutineNeighbor
+
+
+def co_enrollment():
+    """
+    (routine, other routine, clients taking both) for every pair that shares
+    a client. The self-join and GROUP BY run in the database, so only the
+    non-zero cells of the sparse routine x routine matrix come back.
+    """
+    Enrollment = Routine.clients.through
+    return (
+        Enrollment.objects
+        .annotate(other=F("userprofile__routines"))
+        .exclude(other=F("routine_id"))
+        .values_list("routine_id", "other")
+        .annotate(shared=Count("userprofile_id"))
+        .order_by()
+        .iterator()
+    )
+
+
+@transaction.atomic
+def build_neighbors(top_k=None):
+    """Replace every RoutineNeighbor row. Returns the number written."""
+    top_k = top_k or settings.RECOMMENDATION_TOP_K
+    sizes = dict(Routine.objects.filter(client_count__gt=0).values_list("pk", "client_count"))
+
+    best = defaultdict(list)  # routine -> min-heap of (score, neighbor)
+    for routine_id, other_id, shared in co_enrollment():
+        score = shared / math.sqrt(sizes.get(routine_id, shared) * sizes.get(other_id, shared))
+        heap = best[routine_id]
+        if len(heap) < top_k:
+            heapq.heappush(heap, (score, other_id))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, other_id))
+
+    RoutineNeighbor.objects.all().delete()
+    rows = RoutineNeighbor.objects.bulk_create(
+        [
+            RoutineNeighbor(routine_id=routine_id, neighbor_id=neighbor_id, score=score)
+            for routine_id, heap in best.items()
+            for score, neighbor_id in heap
+        ],
+        batch_size=1000,
+    )
+    return len(rows)
+
+
+def recommended_ids(enrolled_ids, location=None, limit=None):
+    """
+    Ids of the routines most similar to ``enrolled_ids`` that the client
+    doesn't take yet, best first. One query on the neighbor index.
+    """
+    if not enrolled_ids:
+        return []
+    neighbors = (
+        RoutineNeighbor.objects
+        .filter(routine_id__in=enrolled_ids)
+        .exclude(neighbor_id__in=enrolled_ids)
+    )
+    if location is not None:
+        neighbors = neighbors.filter(neighbor__location=location)
+    return list(
+        neighbors.values("neighbor_id")
+        .annotate(total=Sum("score"))
+        .order_by("-total", "neighbor_id")
+        .values_list("neighbor_id", flat=True)[:limit or settings.RECOMMENDATION_LIMIT]
+    )
@@ -0,0 +1,200 @@
+"""
+Membership reports for management: signup cohorts and retention, churn,
+and revenue by plan.
+
+Each report reads a narrow columnar extract (a few values_list() columns,
+with the per-membership MIN/MAX already reduced in SQL) from the live
+tables and from the archive (main/archive.py), then aggregates it in a
+single pass. Results are cached for REPORT_CACHE_SECONDS and come back as
+a Table that the reports page renders and the CSV export writes out.
+"""
+import csv
+from collections import Counter, defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min, OuterRef, Subquery
+
+from .models import (
+    Membership,
+    MembershipPeriod,
+    ArchivedMembership,
+    ArchivedMembershipPeriod,
+)
+
+Table = namedtuple("Table", ["title", "header", "rows"])
+
+
+# =========================
+# Extracts
+# =========================
+
+def _months_between(start, end):
+    """Whole months from ``start`` up to ``end``."""
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if end.day < start.day:
+        months -= 1
+    return months
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _month_label(index):
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def _filter(queryset, duration, location, duration_field, location_field):
+    # Duration comes from the period records: renew() and change_plan()
+    # overwrite Membership.duration_days with the latest plan length
+    if duration:
+        queryset = queryset.filter(**{duration_field: duration})
+    if location:
+        queryset = queryset.filter(**{location_field: location})
+    return queryset
+
+
+def members(plan=None, duration=None, location=None):
+    """
+    (joined, left) per membership, live and archived: the first day covered
+    and the first day no longer covered. ``plan`` is the plan signed up
+    with, ``duration`` the length in days of the plan signed up with.
+    """
+    rows = []
+    for model, period_model in (
+        (Membership, MembershipPeriod),
+        (ArchivedMembership, ArchivedMembershipPeriod),
+    ):
+        signup = period_model.objects.filter(
+            membership=OuterRef("pk"), kind="signup"
+        ).order_by("start_date", "id")
+        queryset = model.objects.annotate(
+            signup_plan=Subquery(signup.values("plan_type")[:1]),
+            signup_duration=Subquery(signup.values("duration_days")[:1]),
+            joined=Min("periods__start_date"),
+            left=Max("periods__end_date"),
+        ).filter(joined__isnull=False)
+        if plan:
+            queryset = queryset.filter(signup_plan=plan)
+        queryset = _filter(queryset, duration, location, "signup_duration", "location")
+        rows.extend(queryset.values_list("joined", "left"))
+    return rows
+
+
+def billed_periods(plan=None, duration=None, location=None):
+    """(start_date, end_date, plan_type) of every paid period, live and archived."""
+    rows = []
+    for period_model in (MembershipPeriod, ArchivedMembershipPeriod):
+        queryset = period_model.objects.exclude(kind="pause")
+        queryset = _filter(queryset, duration, location, "duration_days", "membership__location")
+        if plan:
+            queryset = queryset.filter(plan_type=plan)
+        rows.extend(queryset.values_list("start_date", "end_date", "plan_type"))
+    return rows
+
+
+# =========================
+# Reports
+# =========================
+
+def cohort_retention(plan=None, duration=None, location=None, today=None):
+    """
+    One row per signup month: how many joined, and the share still covered
+    1, 2, ... months later. Months that haven't happened yet stay blank,
+    and members still covered today count as retained in every month shown.
+    """
+    today = today or date.today()
+    this_month = _month_index(today)
+    sizes = Counter()
+    retained = defaultdict(Counter)  # cohort -> months retained -> members
+    for joined, left in members(plan, duration, location):
+        cohort = _month_index(joined)
+        sizes[cohort] += 1
+        # Members still covered haven't left yet: keep them out of the
+        # histogram rather than dropping them at a month they haven't
+        # reached (a member who joined on the 20th is not lost on the 10th)
+        if left <= today:
+            retained[cohort][max(_months_between(joined, left), 0)] += 1
+
+    width = this_month - min(sizes) + 1 if sizes else 1
+    header = ["cohort", "members"] + [f"month {k}" for k in range(1, width)]
+    rows = []
+    for cohort in sorted(sizes):
+        # members retained at least k months = suffix sums of the histogram
+        row, still_in = [_month_label(cohort), sizes[cohort]], sizes[cohort]
+        for k in range(1, width):
+            still_in -= retained[cohort][k - 1]
+            row.append(round(100 * still_in / sizes[cohort], 1) if k <= this_month - cohort else "")
+        rows.append(row)
+    return Table("Retention by signup month (%)", header, rows)
+
+
+def churn(plan=None, duration=None, location=None, today=None):
+    """Per month: members covered on the 1st, how many lapsed that month, and the rate."""
+    today = today or date.today()
+    joins, ends, churned = Counter(), Counter(), Counter()
+    for joined, left in members(plan, duration, location):
+        first = _month_index(joined)
+        last = _month_index(date.fromordinal(left.toordinal() - 1))  # last day covered
+        joins[first] += 1
+        ends[last] += 1
+        # Joining and lapsing within one month never counts as active on a 1st
+        if left <= today and first < last:
+            churned[last] += 1
+
+    rows = []
+    if joins:
+        active = 0
+        for month in range(min(joins), _month_index(today) + 1):
+            rate = round(100 * churned[month] / active, 1) if active else ""
+            rows.append([_month_label(month), active, churned[month], rate])
+            active += joins[month] - ends[month]
+    return Table("Monthly churn", ["month", "active on the 1st", "lapsed", "churn %"], rows)
+
+
+def revenue_by_plan(plan=None, duration=None, location=None, today=None):
+    """
+    Revenue per month and plan, estimated from PLAN_PRICES (per 30 days) and
+    the length of each paid period, booked in the month the period starts.
+    """
+    prices = {name: Decimal(price) / 30 for name, price in settings.PLAN_PRICES.items()}
+    plans = [code for code, _ in Membership.PLAN_CHOICES if not plan or code == plan]
+    revenue = defaultdict(lambda: dict.fromkeys(plans, Decimal(0)))
+    for start, end, plan_type in billed_periods(plan, duration, location):
+        revenue[_month_index(start)][plan_type] += prices.get(plan_type, 0) * (end - start).days
+
+    rows, running = [], Decimal(0)
+    for month in sorted(revenue):
+        amounts = [revenue[month][code].quantize(Decimal("0.01")) for code in plans]
+        running += sum(amounts)
+        rows.append([_month_label(month), *amounts, sum(amounts), running])
+    return Table("Revenue by plan", ["month", *plans, "total", "running total"], rows)
+
+
+REPORTS = {
+    "retention": cohort_retention,
+    "churn": churn,
+    "revenue": revenue_by_plan,
+}
+
+
+def get_report(name, plan=None, duration=None, location=None):
+    """
+    A report by name, from the cache when another admin just ran it.
+    ``location`` is a Location id (None for every branch).
+    """
+    key = f"report:{name}:{plan}:{duration}:{location}:{date.today()}"
+    return cache.get_or_set(
+        key,
+        lambda: REPORTS[name](plan=plan, duration=duration, location=location),
+        settings.REPORT_CACHE_SECONDS,
+    )
+
+
+def write_csv(table, stream):
+    writer = csv.writer(stream)
+    writer.writerow(table.header)
+    writer.writerows(table.rows)
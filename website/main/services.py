@@ -0,0 +1,218 @@
+"""
+Set-based write operations used by the admin CRUD screens.
+
+Every function here runs a fixed number of queries no matter how many rows
+it touches, and runs inside a single transaction.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Instructor, Routine, RoutineNeighbor, Exercise, Tombstone
+
+
+def _record_tombstones(model, ids, owners=None):
+    """``owners`` maps the ids of private rows (memberships, profiles) to their user."""
+    owners = owners or {}
+    Tombstone.objects.bulk_create(
+        [Tombstone(model=model._meta.model_name, object_id=pk, user_id=owners.get(pk)) for pk in ids]
+    )
+
+
+def _raw_delete(queryset):
+    # Plain DELETE ... WHERE, without Django collecting every row in Python
+    # and firing post_delete for each one. Callers write the tombstones
+    # themselves and delete dependents first.
+    return queryset._raw_delete(queryset.db)
+
+
+def _counted(rows):
+    """Per-routine number of ``rows`` (exercises or enrollments), as a subquery."""
+    return Coalesce(
+        Subquery(
+            rows.filter(routine_id=OuterRef("pk"))
+            .values("routine_id")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def _uncount(counter, rows):
+    """
+    Take rows that are about to be raw-deleted off the Routine counter cache
+    ``counter`` in one UPDATE (no signals fire for them).
+    """
+    Routine.objects.filter(pk__in=rows.values("routine_id")).update(
+        # Clamped: a count that had drifted low must not fail the delete
+        **{counter: Greatest(F(counter) - _counted(rows), 0)},
+        updated_at=timezone.now(),
+    )
+
+
+@transaction.atomic
+def recount_clients(routine_ids):
+    """
+    Set Routine.client_count of ``routine_ids`` from their enrollments. The
+    routines are locked first, so the count (a new statement, with a fresh
+    snapshot) sees every enrollment committed while we waited for them.
+    """
+    locked = list(
+        Routine.objects.select_for_update()
+        .filter(pk__in=routine_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    Routine.objects.filter(pk__in=locked).update(
+        client_count=_counted(Routine.clients.through.objects.all()),
+        updated_at=timezone.now(),
+    )
+
+
+def recount_routines():
+    """
+    Recompute Routine.client_count and exercise_count from the real rows.
+    Returns the number of routines whose counts were wrong.
+    """
+    counts = {
+        "client_count": _counted(Routine.clients.through.objects.all()),
+        "exercise_count": _counted(Exercise.objects.all()),
+    }
+    wrong = Routine.objects.alias(**{f"real_{name}": value for name, value in counts.items()}).filter(
+        ~Q(client_count=F("real_client_count")) | ~Q(exercise_count=F("real_exercise_count"))
+    )
+    fixed = wrong.count()
+    if fixed:
+        Routine.objects.update(**counts)
+    return fixed
+
+
+@transaction.atomic
+def delete_exercises(exercise_ids):
+    """Delete many exercises at once. Returns the number deleted."""
+    ids = list(Exercise.objects.filter(pk__in=exercise_ids).values_list("pk", flat=True))
+    _record_tombstones(Exercise, ids)
+    _uncount("exercise_count", Exercise.objects.filter(pk__in=ids))
+    return _raw_delete(Exercise.objects.filter(pk__in=ids))
+
+
+def _delete_routine_rows(routines):
+    """Exercises, enrollments, similarity rows, then the routines themselves."""
+    exercises = Exercise.objects.filter(routine__in=routines)
+    enrollments = Routine.clients.through.objects.filter(routine__in=routines)
+    _record_tombstones(Exercise, exercises.values_list("pk", flat=True))
+    _record_tombstones(Routine, routines.values_list("pk", flat=True))
+
+    _raw_delete(exercises)
+    _raw_delete(enrollments)
+    _raw_delete(RoutineNeighbor.objects.filter(Q(routine__in=routines) | Q(neighbor__in=routines)))
+    return _raw_delete(Routine.objects.filter(pk__in=routines.values("pk")))
+
+
+def _delete_counts(routines):
+    return {
+        "routines": routines.count(),
+        "exercises": Exercise.objects.filter(routine__in=routines).count(),
+        "enrollments": Routine.clients.through.objects.filter(routine__in=routines).count(),
+    }
+
+
+def routine_delete_counts(routine_ids):
+    """What delete_routines(routine_ids) would remove, for the confirm page."""
+    counts = _delete_counts(Routine.objects.filter(pk__in=routine_ids))
+    del counts["routines"]  # the routines themselves are what's being confirmed
+    return counts
+
+
+def instructor_delete_counts(instructor_ids):
+    """What delete_instructors(instructor_ids) would remove, for the confirm page."""
+    return _delete_counts(Routine.objects.filter(instructor_id__in=instructor_ids))
+
+
+@transaction.atomic
+def delete_routines(routine_ids):
+    """
+    Delete many routines with their exercises and enrollments.
+    Returns the number of routines deleted.
+    """
+    ids = list(Routine.objects.filter(pk__in=routine_ids).values_list("pk", flat=True))
+    return _delete_routine_rows(Routine.objects.filter(pk__in=ids))
+
+
+@transaction.atomic
+def delete_instructors(instructor_ids):
+    """
+    Delete instructors with all of their routines, exercises and enrollments.
+    The instructors' user accounts are kept. Returns the number deleted.
+    """
+    ids = list(Instructor.objects.filter(pk__in=instructor_ids).values_list("pk", flat=True))
+    _delete_routine_rows(Routine.objects.filter(instructor_id__in=ids))
+    _record_tombstones(Instructor, ids)
+    return _raw_delete(Instructor.objects.filter(pk__in=ids))
+
+
+@transaction.atomic
+def clone_routine(routine):
+    """Copy a routine and all of its exercises. Clients are not copied."""
+    exercises = list(routine.exercises.all())
+    copy = Routine.objects.create(
+        name=f"Copy of {routine.name}"[:100],
+        description=routine.description,
+        instructor_id=routine.instructor_id,
+        location_id=routine.location_id,
+        duration_minutes=routine.duration_minutes,
+        exercise_count=len(exercises),
+    )
+    Exercise.objects.bulk_create([
+        Exercise(
+            routine=copy,
+            name=exercise.name,
+            description=exercise.description,
+            repetitions=exercise.repetitions,
+        )
+        for exercise in exercises
+    ])
+    return copy
+
+
+@transaction.atomic
+def save_exercise_formset(formset, routine):
+    """
+    Save an ExerciseFormSet for one routine with one INSERT, one UPDATE and
+    one DELETE instead of a query per form.
+    """
+    to_create, to_update, to_delete = [], [], []
+    now = timezone.now()
+
+    deleted_forms = formset.deleted_forms
+    for form in deleted_forms:
+        if form.instance.pk:
+            to_delete.append(form.instance.pk)
+
+    for form in formset.forms:
+        if form in deleted_forms or not form.has_changed():
+            continue
+        exercise = form.instance
+        exercise.routine = routine
+        if exercise.pk:
+            # bulk_update() skips auto_now, so bump it by hand
+            exercise.updated_at = now
+            to_update.append(exercise)
+        else:
+            to_create.append(exercise)
+
+    Exercise.objects.bulk_create(to_create)
+    if to_create:
+        # bulk_create() sends no post_save
+        Routine.objects.filter(pk=routine.pk).update(
+            exercise_count=F("exercise_count") + len(to_create),
+        )
+    Exercise.objects.bulk_update(
+        to_update, ["name", "description", "repetitions", "updated_at"]
+    )
+    if to_delete:
+        delete_exercises(to_delete)
+
+    return len(to_create), len(to_update), len(to_delete)
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import Location, Instructor, Membership, Routine, Exercise, UserProfile, Tombstone
+from .services import recount_clients
 
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -15,6 +18,102 @@ def save_profile(sender, instance, **kwargs):
     instance.profile.save()
 
 
+# =========================
+# SYNC: tombstones + enrollment changes (touch, client_count)
+# =========================
+
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Instructor)
+@receiver(post_delete, sender=Membership)
+@receiver(post_delete, sender=Routine)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_delete, sender=UserProfile)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+        user_id=instance.user_id if sender in (Membership, UserProfile) else None,
+    )
+
+
+@receiver(m2m_changed, sender=Routine.clients.through)
+def update_routines_on_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Routine.client_count current and bump Routine.updated_at (so the
+    change feed sees it) when a routine's clients change.
+
+    The affected routines are recounted rather than adjusted by len(pk_set):
+    two requests adding (or removing) the same enrollment at once both send
+    the same pk_set, though only one of them changed a row.
+    """
+    if action in ("pre_remove", "pre_clear"):
+        # remove() passes ids that may not be enrolled and clear() passes
+        # none, so remember which enrollments are really going away
+        enrollments = sender.objects.filter(**{"userprofile" if reverse else "routine": instance})
+        if pk_set is not None:
+            enrollments = enrollments.filter(**{"routine_id__in" if reverse else "userprofile_id__in": pk_set})
+        instance._removed_enrollments = list(enrollments.values_list("routine_id", flat=True))
+        return
+
+    if action == "post_add":
+        routine_ids = pk_set if reverse else [instance.pk] if pk_set else []
+    elif action in ("post_remove", "post_clear"):
+        removed = instance.__dict__.pop("_removed_enrollments", [])
+        routine_ids = removed if reverse else [instance.pk] if removed else []
+    else:
+        return
+    if routine_ids:
+        recount_clients(routine_ids)
+
+
+# =========================
+# COUNTER CACHES: Routine.exercise_count (client_count is kept above)
+# =========================
+
+def _add_to_exercise_count(routine_id, change):
+    Routine.objects.filter(pk=routine_id).update(exercise_count=Greatest(F("exercise_count") + change, 0))
+
+
+@receiver(pre_save, sender=Exercise)
+def remember_exercise_routine(sender, instance, update_fields=None, **kwargs):
+    # Needed to move the count along when an exercise changes routine
+    if not instance._state.adding and (update_fields is None or "routine" in update_fields):
+        instance._old_routine_id = (
+            Exercise.objects.filter(pk=instance.pk).values_list("routine_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Exercise)
+def count_saved_exercise(sender, instance, created, **kwargs):
+    if created:
+        _add_to_exercise_count(instance.routine_id, 1)
+        return
+    old_routine_id = instance.__dict__.pop("_old_routine_id", None)
+    if old_routine_id is not None and old_routine_id != instance.routine_id:
+        _add_to_exercise_count(old_routine_id, -1)
+        _add_to_exercise_count(instance.routine_id, 1)
+
+
+@receiver(post_delete, sender=Exercise)
+def count_deleted_exercise(sender, instance, **kwargs):
+    _add_to_exercise_count(instance.routine_id, -1)
+
+
+@receiver(pre_delete, sender=UserProfile)
+def remember_client_routines(sender, instance, **kwargs):
+    # The cascade deletes the profile's enrollments without m2m_changed
+    instance._enrolled_routine_ids = list(
+        Routine.clients.through.objects.filter(userprofile=instance).values_list("routine_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=UserProfile)
+def uncount_deleted_client(sender, instance, **kwargs):
+    routine_ids = instance.__dict__.pop("_enrolled_routine_ids", [])
+    if routine_ids:
+        recount_clients(routine_ids)
+
+
 #@receiver(post_save, sender=User)
 #def save_profile(sender, instance, **kwargs):
 #    try:
@@ -0,0 +1,90 @@
+// Search-as-you-type picker for RoutineForm.clients (ClientAutocompleteWidget).
+// Only the selected clients are rendered by the server; everyone else is
+// fetched from the search endpoint as the admin types.
+document.querySelectorAll('.client-autocomplete').forEach(function (box) {
+    var select = box.querySelector('select');
+    var input = box.querySelector('.client-autocomplete-input');
+    var results = box.querySelector('.client-autocomplete-results');
+    var selectedList = box.querySelector('.client-autocomplete-selected');
+    var url = select.dataset.autocompleteUrl;
+    var timer = null;
+
+    function addClient(id, label) {
+        if (select.querySelector('option[value="' + id + '"]')) {
+            return;
+        }
+        select.add(new Option(label, id, true, true));
+        var item = document.createElement('li');
+        item.dataset.value = id;
+        item.textContent = label + ' ';
+        var remove = document.createElement('button');
+        remove.type = 'button';
+        remove.className = 'btn btn-sm btn-link';
+        remove.innerHTML = '&times;';
+        item.appendChild(remove);
+        selectedList.appendChild(item);
+    }
+
+    selectedList.addEventListener('click', function (event) {
+        if (event.target.tagName !== 'BUTTON') {
+            return;
+        }
+        var item = event.target.closest('li');
+        var option = select.querySelector('option[value="' + item.dataset.value + '"]');
+        if (option) {
+            option.remove();
+        }
+        item.remove();
+    });
+
+    results.addEventListener('click', function (event) {
+        var item = event.target.closest('li');
+        if (!item) {
+            return;
+        }
+        addClient(item.dataset.value, item.textContent);
+        results.innerHTML = '';
+        input.value = '';
+    });
+
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        var term = input.value.trim();
+        if (term.length < 2) {
+            results.innerHTML = '';
+            return;
+        }
+        timer = setTimeout(function () {
+            fetch(url + '?q=' + encodeURIComponent(term))
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    results.innerHTML = '';
+                    data.results.forEach(function (client) {
+                        var item = document.createElement('li');
+                        item.className = 'list-group-item list-group-item-action';
+                        item.dataset.value = client.id;
+                        item.textContent = client.text;
+                        results.appendChild(item);
+                    });
+                });
+        }, 250);
+    });
+});
+
+// Live enrollment counts on the client routine page (views.occupancy_events):
+// every [data-client-count] inside the [data-occupancy-url] element.
+document.querySelectorAll('[data-occupancy-url]').forEach(function (page) {
+    if (!window.EventSource) {
+        return;
+    }
+    var source = new EventSource(page.dataset.occupancyUrl);
+    source.addEventListener('occupancy', function (event) {
+        var counts = JSON.parse(event.data);
+        Object.keys(counts).forEach(function (routineId) {
+            var count = counts[routineId];
+            page.querySelectorAll('[data-client-count="' + routineId + '"]').forEach(function (cell) {
+                cell.textContent = count + (count === 1 ? ' client' : ' clients');
+            });
+        });
+    });
+});
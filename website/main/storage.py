@@ -0,0 +1,133 @@
+"""
+Static files storage used by collectstatic in production.
+
+On top of WhiteNoise's hashed, gzip/Brotli-compressed files it:
+    - minifies CSS and JS before they are hashed
+    - writes resized WebP/AVIF copies of the images under ``main/images``,
+      which the ``{% responsive_image %}`` tag turns into a srcset
+
+Brotli (.br) files are produced by WhiteNoise as soon as the ``brotli``
+package is installed. Pillow is optional: without it images are only hashed.
+"""
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover - Pillow not installed
+    Image = None
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+RESPONSIVE_IMAGE_DIR = getattr(settings, 'RESPONSIVE_IMAGE_DIR', 'main/images/')
+RESPONSIVE_IMAGE_WIDTHS = getattr(settings, 'RESPONSIVE_IMAGE_WIDTHS', (480, 960, 1600))
+
+# format -> Pillow save() options, best compression first
+RESPONSIVE_IMAGE_FORMATS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 78, 'method': 6},
+}
+
+
+def variant_name(name, width, fmt):
+    """main/images/hero.jpg -> main/images/hero-480w.webp"""
+    root, _ext = os.path.splitext(name)
+    return f"{root}-{width}w.{fmt}"
+
+
+VARIANT_RE = re.compile(r'^(?P<root>.+)-(?P<width>\d+)w\.(?P<fmt>avif|webp)$')
+
+
+CSS_TOKEN_RE = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""  # strings, kept as-is
+    r"|(/\*.*?\*/)"                                # comments
+    r"|\s*([{};,])\s*"                             # punctuation
+    r"|(\s+)",                                      # other whitespace
+    re.S,
+)
+
+
+def _css_token(match):
+    string, comment, punctuation, _space = match.groups()
+    if string:
+        return string
+    if comment:
+        return ''
+    if punctuation:
+        return punctuation
+    return ' '
+
+
+def minify_css(source):
+    # second pass picks up whitespace left around removed comments
+    for _ in range(2):
+        source = CSS_TOKEN_RE.sub(_css_token, source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    # Deliberately conservative: no renaming or statement rewriting, only
+    # indentation, blank lines and whole-line comments are dropped.
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+class OptimizedStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            self.minify_files(paths)
+            if Image is not None:
+                self.create_image_variants(paths)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _replace(self, name, content):
+        # collectstatic already copied the original here; overwrite it in place
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(content))
+
+    def minify_files(self, paths):
+        for name, (storage, path) in list(paths.items()):
+            minify = MINIFIERS.get(os.path.splitext(name)[1])
+            if minify is None or '.min.' in name:
+                continue
+            with storage.open(path) as source:
+                content = source.read().decode('utf-8')
+            self._replace(name, minify(content).encode('utf-8'))
+            # hash (and compress) the minified copy, not the original
+            paths[name] = (self, name)
+
+    def create_image_variants(self, paths):
+        formats = [fmt for fmt in RESPONSIVE_IMAGE_FORMATS if features.check(fmt)]
+        for name, (storage, path) in list(paths.items()):
+            if not name.startswith(RESPONSIVE_IMAGE_DIR) or not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            with storage.open(path) as source:
+                image = Image.open(source)
+                image.load()
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+            widths = [w for w in RESPONSIVE_IMAGE_WIDTHS if w < image.width] + [image.width]
+            for width in widths:
+                height = round(image.height * width / image.width)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    target = variant_name(name, width, fmt)
+                    buffer = io.BytesIO()
+                    resized.save(buffer, format=fmt.upper(), **RESPONSIVE_IMAGE_FORMATS[fmt])
+                    self._replace(target, buffer.getvalue())
+                    paths[target] = (self, target)
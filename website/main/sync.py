@@ -0,0 +1,161 @@
+"""
+Change feed for incremental client sync.
+
+Mobile and kiosk clients keep the cursor returned by the last call and only
+ask for what changed after it, instead of re-downloading every table. The
+first sync is a full dump, sent in pages of SYNC_PAGE_SIZE rows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Location, Instructor, Membership, Routine, Exercise, UserProfile, Tombstone
+
+
+# model label -> (model, fields sent to clients)
+SYNC_MODELS = {
+    "location": (Location, ["id", "name", "slug", "city", "updated_at"]),
+    "instructor": (Instructor, ["id", "user_id", "location_id", "specialty", "bio", "updated_at"]),
+    "membership": (Membership, ["id", "user_id", "location_id", "plan_type", "start_date", "duration_days", "is_active", "expires_on", "paused_on", "auto_renew", "updated_at"]),
+    "routine": (Routine, ["id", "name", "description", "instructor_id", "location_id", "duration_minutes", "updated_at"]),
+    "exercise": (Exercise, ["id", "routine_id", "name", "description", "repetitions", "updated_at"]),
+    "userprofile": (UserProfile, ["id", "user_id", "phone", "is_admin", "updated_at"]),
+}
+
+# Models that only admins may see in full; clients get their own rows only
+PRIVATE_MODELS = {"membership", "userprofile"}
+
+
+def parse_cursor(value):
+    """Turn the ``since`` query param into an aware datetime (None = full sync)."""
+    if not value:
+        return None
+    cursor = parse_datetime(value)
+    if cursor is None:
+        raise ValueError(f"Invalid cursor: {value!r}")
+    if timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor, timezone.utc)
+    return cursor
+
+
+def parse_page(value):
+    """
+    Turn the ``page`` query param of a full dump into (started, table, last
+    id); None for the first page.
+    """
+    if not value:
+        return None
+    try:
+        started, label, last_id = value.split("|")
+        page = (parse_cursor(started), label, int(last_id))
+    except ValueError:
+        raise ValueError(f"Invalid page: {value!r}")
+    if label not in SYNC_MODELS:
+        raise ValueError(f"Invalid page: {value!r}")
+    return page
+
+
+def _next_cursor(now):
+    # updated_at is set when a row is saved, not when its transaction
+    # commits, so a row saved just before ``now`` may only become visible
+    # after this read. Step the cursor back so the next call sends rows from
+    # the last SYNC_CURSOR_MARGIN seconds again; clients upsert by id.
+    return (now - timedelta(seconds=settings.SYNC_CURSOR_MARGIN)).isoformat()
+
+
+def _rows(label, queryset, user, is_admin, limit=None):
+    fields = SYNC_MODELS[label][1]
+    if label in PRIVATE_MODELS and not is_admin:
+        queryset = queryset.filter(user=user)
+    return list(queryset.values(*fields)[:limit])
+
+
+def _add_clients(routines, user, is_admin):
+    """
+    Enrollment lives on the M2M table: send it with the routines. Only
+    admins see who else takes a routine; members only see themselves.
+    """
+    enrollments = Routine.clients.through.objects.filter(routine_id__in=[row["id"] for row in routines])
+    if not is_admin:
+        enrollments = enrollments.filter(userprofile__user=user)
+    clients = {}
+    for routine_id, profile_id in enrollments.values_list("routine_id", "userprofile_id"):
+        clients.setdefault(routine_id, []).append(profile_id)
+    for row in routines:
+        row["clients"] = clients.get(row["id"], [])
+
+
+def _is_admin(user):
+    return hasattr(user, "profile") and user.profile.is_admin
+
+
+def changes_since(cursor, user):
+    """
+    Return every row changed (and every row deleted) after ``cursor``.
+
+    Each table is read with a single query on the indexed ``updated_at``
+    column, so the cost grows with the size of the delta, not the table.
+    """
+    is_admin = _is_admin(user)
+    next_cursor = _next_cursor(timezone.now())
+    changes = {}
+
+    for label, (model, fields) in SYNC_MODELS.items():
+        queryset = model.objects.filter(updated_at__gt=cursor).order_by("updated_at")
+        changes[label] = _rows(label, queryset, user, is_admin)
+    _add_clients(changes["routine"], user, is_admin)
+
+    tombstones = Tombstone.objects.filter(deleted_at__gt=cursor)
+    if not is_admin:
+        # Same rule as the rows: only the user's own private rows
+        tombstones = tombstones.filter(~Q(model__in=PRIVATE_MODELS) | Q(user_id=user.pk))
+    changes["deleted"] = list(
+        tombstones.order_by("deleted_at").values("model", "object_id", "deleted_at")
+    )
+
+    return {
+        "cursor": next_cursor,
+        "changes": changes,
+    }
+
+
+def full_dump(user, page=None):
+    """
+    One page of the full dump: up to SYNC_PAGE_SIZE rows, table after table
+    in id order. ``next`` is the ``page`` to ask for after this one; the
+    last page has none, and its cursor (from when the dump started) is
+    where incremental syncs pick up.
+    """
+    is_admin = _is_admin(user)
+    started, after_label, after_id = page or (timezone.now(), next(iter(SYNC_MODELS)), 0)
+    labels = list(SYNC_MODELS)
+    remaining = settings.SYNC_PAGE_SIZE
+    changes = {label: [] for label in labels}
+    next_page = None
+
+    for label in labels[labels.index(after_label):]:
+        if not remaining:
+            next_page = f"{started.isoformat()}|{label}|0"
+            break
+        queryset = SYNC_MODELS[label][0].objects.order_by("id")
+        if label == after_label:
+            queryset = queryset.filter(id__gt=after_id)
+        # One extra row tells whether the table has more
+        rows = _rows(label, queryset, user, is_admin, limit=remaining + 1)
+        if len(rows) > remaining:
+            changes[label] = rows[:remaining]
+            next_page = f"{started.isoformat()}|{label}|{rows[remaining - 1]['id']}"
+            break
+        changes[label] = rows
+        remaining -= len(rows)
+    _add_clients(changes["routine"], user, is_admin)
+    changes["deleted"] = []
+
+    return {
+        "cursor": None if next_page else _next_cursor(started),
+        "next": next_page,
+        "changes": changes,
+    }
@@ -0,0 +1,32 @@
+"""
+Background tasks. Queue them with main.queue.enqueue("<function name>", ...).
+"""
+from . import weather
+from .archive import archive_members
+from .queue import task
+from .services import delete_instructors, delete_routines
+
+
+@task
+def refresh_weather(city):
+    weather.refresh(city)
+
+
+@task
+def archive_user(user_id):
+    archive_members([user_id])
+
+
+@task
+def delete_routine(routine_id):
+    delete_routines([routine_id])
+
+
+@task
+def delete_routine_batch(routine_ids):
+    delete_routines(routine_ids)
+
+
+@task
+def delete_instructor(instructor_id):
+    delete_instructors([instructor_id])
@@ -0,0 +1,56 @@
+"""
+{% responsive_image %} renders a <picture> with AVIF/WebP srcsets for the
+variants OptimizedStaticFilesStorage writes during collectstatic.
+
+Without a manifest (runserver, or collectstatic not run yet) it falls back to
+a plain <img> pointing at the original file.
+"""
+import os
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from main.storage import RESPONSIVE_IMAGE_FORMATS, VARIANT_RE
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _variants(name):
+    """{fmt: [(width, variant_name), ...]} for one image, smallest first."""
+    root, _ext = os.path.splitext(name)
+    found = {}
+    # The manifest is loaded once per process, so this scan is cached too
+    for candidate in getattr(staticfiles_storage, 'hashed_files', {}):
+        match = VARIANT_RE.match(candidate)
+        if match and match['root'] == root:
+            found.setdefault(match['fmt'], []).append((int(match['width']), candidate))
+    return {fmt: sorted(found[fmt]) for fmt in RESPONSIVE_IMAGE_FORMATS if fmt in found}
+
+
+@register.simple_tag
+def responsive_image(name, alt='', sizes='100vw', **attrs):
+    """
+    Usage: {% responsive_image 'main/images/hero.jpg' alt='Hero' sizes='100vw' %}
+    Extra keyword arguments (class, loading, ...) are added to the <img>.
+    """
+    attrs.setdefault('loading', 'lazy')
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    img = format_html('<img src="{}" alt="{}"{}>', static(name), alt, extra)
+
+    variants = _variants(name)
+    if not variants:
+        return img
+
+    sources = format_html_join(
+        '',
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (fmt, ', '.join(f"{static(variant)} {width}w" for width, variant in widths), sizes)
+            for fmt, widths in variants.items()
+        ),
+    )
+    return format_html('<picture>{}{}</picture>', sources, img)
@@ -0,0 +1,107 @@
+"""
+Template engine helpers for production:
+    - warm_templates() compiles every template of the app into the cached
+      loader, so the first request after a restart doesn't pay for it
+    - TimedDjangoTemplates records how long each template takes to render
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateDoesNotExist, engines
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+
+class RenderStats:
+    """Per-process render counters: template name -> count/total/max in ms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+                for name, stats in sorted(self._stats.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+render_stats = RenderStats()
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            name = self.origin.template_name or "<string>"
+            render_stats.record(name, elapsed_ms)
+            if elapsed_ms > getattr(settings, "TEMPLATE_SLOW_RENDER_MS", 200):
+                logger.warning("Slow template render: %s took %.1f ms", name, elapsed_ms)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend that times every top-level render."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def app_template_names(app_label="main"):
+    """Names of every .html template shipped by an app, e.g. 'main/home.html'."""
+    template_dir = Path(apps.get_app_config(app_label).path) / "templates"
+    return sorted(
+        path.relative_to(template_dir).as_posix()
+        for path in template_dir.rglob("*.html")
+    )
+
+
+def warm_templates(app_label="main"):
+    """
+    Compile every template of the app through every configured engine.
+
+    With the cached loader this leaves all of them parsed in memory; returns
+    {template name: compile time in ms}. Called by the web entry points
+    (website/asgi.py, website/wsgi.py) when TEMPLATE_WARMUP is on.
+    """
+    timings = {}
+    for engine in engines.all():
+        for name in app_template_names(app_label):
+            start = time.perf_counter()
+            try:
+                engine.get_template(name)
+            except TemplateDoesNotExist:
+                continue  # not one this engine serves
+            except Exception:
+                # A broken template should fail the request that uses it, not boot
+                logger.exception("Could not precompile template %s", name)
+                continue
+            timings[name] = timings.get(name, 0) + (time.perf_counter() - start) * 1000
+    logger.info("Precompiled %d templates in %.1f ms", len(timings), sum(timings.values()))
+    return timings
@@ -1,3 +1,1079 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import runpy
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.db.models.signals import m2m_changed
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template import engines
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import occupancy, profiling, queue, reports, weather
+from .templating import app_template_names, warm_templates
+from .archive import archivable_user_ids, archive_members, restore_member
+from .ratelimit import hit
+from .storage import minify_css, minify_js
+from .recommendations import build_neighbors, recommended_ids
+from .sync import changes_since, full_dump, parse_cursor, parse_page
+from .memberships import advance_periods, change_plan, pause, renew, renew_expiring, resume, start_membership
+from .forms import ExerciseForm, ExerciseFormSet, RoutineForm
+from .models import (
+    ArchivedEnrollment, ArchivedMembership, ArchivedMembershipPeriod, Exercise, Instructor, Location, Membership,
+    MembershipPeriod, NotificationLog, RequestProfile, Routine, RoutineNeighbor, Task, Tombstone, UserProfile,
+)
+from .notifications import EmailNotificationBackend, send_expiry_notices
+from .services import (
+    clone_routine, delete_exercises, delete_instructors, delete_routines, recount_routines, save_exercise_formset,
+)
+
+
+class RoutineCounterCacheTests(TransactionTestCase):
+    """Routine.client_count / exercise_count must match the real rows."""
+
+    def setUp(self):
+        self.location = location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        instructor = Instructor.objects.create(
+            user=User.objects.create_user("coach"), location=location, specialty="Yoga"
+        )
+        self.routines = [
+            Routine.objects.create(name=f"Routine {i}", description="", instructor=instructor, location=location)
+            for i in range(3)
+        ]
+        self.profiles = [User.objects.create_user(f"client{i}").profile for i in range(8)]
+
+    def assertCountsMatch(self):
+        for routine in Routine.objects.all():
+            self.assertEqual(routine.client_count, routine.clients.count(), routine)
+            self.assertEqual(routine.exercise_count, routine.exercises.count(), routine)
+        self.assertEqual(recount_routines(), 0)
+
+    def test_counts_follow_every_kind_of_change(self):
+        first, second, _ = self.routines
+        first.clients.add(*self.profiles[:4])
+        first.clients.add(self.profiles[0])  # already enrolled
+        first.clients.remove(self.profiles[1], self.profiles[7])  # one not enrolled
+        self.profiles[2].routines.add(second)
+        self.profiles[3].routines.clear()
+        second.clients.set(self.profiles[4:6])
+
+        exercise = Exercise.objects.create(routine=first, name="Squat", description="")
+        Exercise.objects.create(routine=first, name="Lunge", description="")
+        exercise.routine = second
+        exercise.save()
+        delete_exercises([exercise.pk])
+        self.profiles[4].user.delete()
+
+        self.assertCountsMatch()
+
+    def test_duplicate_add_and_remove_signals_count_once(self):
+        # What the loser of two concurrent add()/remove() calls for the same
+        # enrollment does: it sends the same pk_set, though it changed no row
+        routine, profile = self.routines[0], self.profiles[0]
+        through = Routine.clients.through
+        routine.clients.add(profile)
+        m2m_changed.send(
+            sender=through, instance=routine, action="post_add", reverse=False,
+            model=UserProfile, pk_set={profile.pk}, using="default",
+        )
+        self.assertCountsMatch()
+
+        profile.routines.remove(routine)
+        for action in ("pre_remove", "post_remove"):
+            m2m_changed.send(
+                sender=through, instance=profile, action=action, reverse=True,
+                model=Routine, pk_set={routine.pk}, using="default",
+            )
+        self.assertCountsMatch()
+
+    def test_counts_stay_correct_under_concurrent_updates(self):
+        if connection.vendor == "sqlite":
+            self.skipTest("SQLite serializes writers, so there is no concurrency to test.")
+
+        errors = []
+        barrier = threading.Barrier(len(self.profiles))
+
+        def work(index):
+            # Every thread toggles the same enrollments, like double-submitted
+            # toggle_routine_enrollment requests
+            profile = self.profiles[0]
+            try:
+                for _ in range(5):
+                    barrier.wait()
+                    for routine in self.routines:
+                        routine.clients.add(profile)
+                        Exercise.objects.create(routine=routine, name="Plank", description="")
+                    barrier.wait()
+                    self.routines[0].clients.remove(profile)
+                    if index % 2:
+                        profile.routines.clear()
+                    Exercise.objects.create(routine=self.routines[1], name="Lunge", description="").delete()
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+                barrier.abort()
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(len(self.profiles))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertCountsMatch()
+
+    def test_uncount_never_goes_negative(self):
+        Exercise.objects.create(routine=self.routines[0], name="Squat", description="")
+        Routine.objects.filter(pk=self.routines[0].pk).update(exercise_count=0)
+
+        delete_exercises(Exercise.objects.values_list("pk", flat=True))
+        self.assertEqual(Routine.objects.get(pk=self.routines[0].pk).exercise_count, 0)
+
+    def test_deleting_a_client_recounts_their_routines(self):
+        self.routines[0].clients.add(*self.profiles[:3])
+        Routine.objects.filter(pk=self.routines[0].pk).update(client_count=0)  # drifted
+
+        self.profiles[0].user.delete()
+        self.assertEqual(Routine.objects.get(pk=self.routines[0].pk).client_count, 2)
+        self.assertCountsMatch()
+
+    def test_recount_repairs_drift(self):
+        self.routines[0].clients.add(*self.profiles)
+        Routine.objects.filter(pk=self.routines[0].pk).update(client_count=0, exercise_count=5)
+
+        self.assertEqual(recount_routines(), 1)
+        self.assertCountsMatch()
+
+    def test_bulk_deletes_leave_tombstones_and_counts(self):
+        admin = User.objects.create_user("boss")
+        admin.profile.is_admin = True
+        admin.profile.save()
+        first, second, third = self.routines
+        for routine in self.routines:
+            routine.clients.add(*self.profiles[:3])
+            Exercise.objects.create(routine=routine, name="Squat", description="")
+        other_coach = Instructor.objects.create(user=User.objects.create_user("coach2"), location=self.location)
+        Routine.objects.filter(pk=third.pk).update(instructor=other_coach)
+        gone_exercises = set(Exercise.objects.exclude(routine=second).values_list("pk", flat=True))
+        cursor = timezone.now() - timedelta(seconds=1)
+
+        self.assertEqual(delete_routines([first.pk, 999]), 1)
+        self.assertEqual(delete_instructors([other_coach.pk]), 1)
+
+        deleted = {
+            (row["model"], row["object_id"]) for row in changes_since(cursor, admin)["changes"]["deleted"]
+        }
+        self.assertEqual(deleted, {
+            ("routine", first.pk), ("routine", third.pk), ("instructor", other_coach.pk),
+            *(("exercise", pk) for pk in gone_exercises),
+        })
+
+        self.assertEqual(list(Routine.objects.all()), [second])
+        self.assertTrue(User.objects.filter(username="coach2").exists())
+        self.assertEqual(Routine.clients.through.objects.count(), 3)
+        self.assertCountsMatch()
+
+    def test_exercise_formset_saves_in_bulk(self):
+        routine = self.routines[0]
+        kept, dropped = [
+            Exercise.objects.create(routine=routine, name=name, description="") for name in ("Squat", "Lunge")
+        ]
+        formset = ExerciseFormSet({
+            "form-TOTAL_FORMS": "4", "form-INITIAL_FORMS": "2",
+            "form-0-id": kept.pk, "form-0-name": "Deep squat", "form-0-description": "x",
+            "form-1-id": dropped.pk, "form-1-name": "Lunge", "form-1-description": "x", "form-1-DELETE": "on",
+            "form-2-name": "Plank", "form-2-description": "x",
+            "form-3-name": "", "form-3-description": "",  # blank extra row
+        }, queryset=routine.exercises.order_by("id"))
+        self.assertTrue(formset.is_valid(), formset.errors)
+
+        self.assertEqual(save_exercise_formset(formset, routine), (1, 1, 1))
+        self.assertEqual(sorted(routine.exercises.values_list("name", flat=True)), ["Deep squat", "Plank"])
+        self.assertCountsMatch()
+
+    def test_clone_copies_exercises_but_not_clients(self):
+        routine = self.routines[0]
+        routine.clients.add(*self.profiles[:2])
+        for name in ("Squat", "Lunge"):
+            Exercise.objects.create(routine=routine, name=name, description="", repetitions="3x10")
+
+        copy = clone_routine(routine)
+        self.assertEqual(copy.name, "Copy of Routine 0")
+        self.assertEqual(
+            sorted(copy.exercises.values_list("name", "repetitions")),
+            [("Lunge", "3x10"), ("Squat", "3x10")],
+        )
+        self.assertEqual(copy.clients.count(), 0)
+        self.assertCountsMatch()
+
+    @override_settings(
+        TASKS_EAGER=False,
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    def test_bulk_delete_goes_through_the_queue(self):
+        admin = User.objects.create_user("boss")
+        admin.profile.is_admin = True
+        admin.profile.save()
+        self.client.force_login(admin)
+        self.client.post("/locations/switch/", {"location": self.location.pk})
+        first, second, _ = self.routines
+        first.clients.add(*self.profiles)
+        Exercise.objects.create(routine=second, name="Squat", description="")
+
+        self.client.post("/routines/bulk-delete/", {"selected": [first.pk, second.pk]})
+        self.assertEqual(Routine.objects.count(), 3)  # not yet
+
+        task_row = queue.claim(1)[0]
+        self.assertEqual((task_row.name, task_row.args), ("delete_routine_batch", [[first.pk, second.pk]]))
+        queue.run(task_row)
+        self.assertEqual(list(Routine.objects.all()), self.routines[2:])
+        self.assertFalse(Exercise.objects.exists())
+        self.assertCountsMatch()
+
+
+@override_settings(TASKS_EAGER=False, TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_BACKOFF=10)
+class TaskQueueTests(TestCase):
+    """main.queue: enqueue, claim, run, retries and stale tasks."""
+
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(queue.registry, {"record": self.calls.append, "crash": self.crash})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def crash(*args):
+        raise RuntimeError("boom")
+
+    def enqueue(self, name, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return queue.enqueue(name, *args, **kwargs)
+
+    def test_claim_and_run(self):
+        self.enqueue("record", 1)
+        self.enqueue("record", 2, delay=60)  # not due yet
+
+        claimed = queue.claim(10)
+        self.assertEqual([task_row.args for task_row in claimed], [[1]])
+        self.assertEqual(queue.claim(10), [])  # already running
+
+        queue.run(claimed[0])
+        task_row = Task.objects.get(pk=claimed[0].pk)
+        self.assertEqual((task_row.status, task_row.attempts, task_row.locked_at), ("done", 1, None))
+        self.assertEqual(self.calls, [1])
+
+    def test_failed_task_is_retried_then_failed(self):
+        self.enqueue("crash")
+        task_row = queue.claim(1)[0]
+        with self.assertLogs("main.queue", "WARNING"):
+            queue.run(task_row)
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ("queued", 1))
+        self.assertGreater(task_row.run_after, timezone.now() + timedelta(seconds=5))
+        self.assertIn("boom", task_row.last_error)
+
+        Task.objects.update(run_after=timezone.now())
+        with self.assertLogs("main.queue", "ERROR"):
+            queue.run(queue.claim(1)[0])
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ("failed", 2))
+
+    def test_stale_running_task_counts_an_attempt(self):
+        self.enqueue("record", 1)
+        queue.claim(1)
+        long_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.update(locked_at=long_ago)
+
+        # Its worker died: claimed again, with the lost run counted
+        task_row = queue.claim(1)[0]
+        self.assertEqual(Task.objects.get(pk=task_row.pk).attempts, 1)
+
+        # Dies again: out of attempts, not requeued
+        Task.objects.update(locked_at=long_ago)
+        self.assertEqual(queue.claim(1), [])
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ("failed", 2))
+
+    def test_prune_deletes_old_finished_tasks(self):
+        for status in ("done", "failed", "queued"):
+            Task.objects.create(name="record", status=status)
+        Task.objects.create(name="record", status="done")
+        Task.objects.filter(pk__lte=Task.objects.order_by("pk")[2].pk).update(
+            updated_at=timezone.now() - timedelta(days=30)
+        )
+
+        self.assertEqual(queue.prune(), 2)
+        self.assertEqual(sorted(Task.objects.values_list("status", flat=True)), ["done", "queued"])
+
+
+@override_settings(TASKS_EAGER=False)
+class WeatherRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cache_miss_queues_one_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.assertEqual(weather.current_weather("Mendoza")["weather_data"], {})
+                weather.forecast("Mendoza")
+        self.assertEqual(Task.objects.filter(name="refresh_weather").count(), 1)
+
+    def test_refresh_fills_cache_and_allows_the_next_one(self):
+        with mock.patch.object(weather, "_get_json", return_value={"cod": 200, "name": "Mendoza"}):
+            weather.current_weather("Mendoza")
+            weather.refresh("Mendoza")
+        self.assertEqual(weather.current_weather("Mendoza")["weather_data"]["city"], "Mendoza")
+
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            weather.current_weather("Mendoza")
+        self.assertEqual(Task.objects.filter(name="refresh_weather").count(), 1)
+
+
+class MembershipLifecycleTests(TestCase):
+    """main.memberships keeps the Membership row in step with its periods."""
+
+    def setUp(self):
+        self.today = date.today()
+        location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        self.membership = start_membership(User.objects.create_user("member"), location, "basic", 30)
+
+    def backdate(self, days):
+        """Pretend everything happened ``days`` earlier."""
+        shift = timedelta(days=days)
+        self.membership.periods.update(start_date=F("start_date") - shift, end_date=F("end_date") - shift)
+        Membership.objects.filter(pk=self.membership.pk).update(expires_on=F("expires_on") - shift)
+        self.membership.refresh_from_db()
+
+    def periods(self):
+        return list(self.membership.periods.values_list("kind", "plan_type", "start_date", "end_date"))
+
+    def test_signup(self):
+        self.assertEqual(self.periods(), [("signup", "basic", self.today, self.today + timedelta(days=30))])
+        self.assertEqual(self.membership.expires_on, self.today + timedelta(days=30))
+        self.assertEqual(self.membership.current_period.kind, "signup")
+
+    def test_renewal_in_advance_only_extends_the_expiry(self):
+        renewal = renew(self.membership, 30, plan_type="vip")
+        self.membership.refresh_from_db()
+        self.assertEqual(renewal.start_date, self.today + timedelta(days=30))
+        self.assertEqual(self.membership.expires_on, self.today + timedelta(days=60))
+        self.assertEqual(self.membership.plan_type, "basic")
+        self.assertEqual(self.membership.current_period.kind, "signup")
+
+        self.assertEqual(advance_periods(self.today + timedelta(days=29)), 0)
+        self.assertEqual(advance_periods(self.today + timedelta(days=30)), 1)
+        self.membership.refresh_from_db()
+        self.assertEqual(self.membership.plan_type, "vip")
+        self.assertEqual(self.membership.current_period, renewal)
+
+    def test_renewal_of_a_lapsed_membership_starts_today(self):
+        self.backdate(40)
+        renew(self.membership, 30, plan_type="premium")
+        self.membership.refresh_from_db()
+        self.assertEqual(self.periods()[-1], ("renewal", "premium", self.today, self.today + timedelta(days=30)))
+        self.assertEqual(self.membership.plan_type, "premium")
+
+    def test_change_plan_splits_the_running_period(self):
+        renew(self.membership, 30)
+        self.backdate(10)
+        change_plan(self.membership, "vip")
+        self.membership.refresh_from_db()
+        self.assertEqual(self.periods(), [
+            ("signup", "basic", self.today - timedelta(days=10), self.today),
+            ("plan_change", "vip", self.today, self.today + timedelta(days=20)),
+            ("renewal", "vip", self.today + timedelta(days=20), self.today + timedelta(days=50)),
+        ])
+        self.assertEqual((self.membership.plan_type, self.membership.current_period.kind), ("vip", "plan_change"))
+        self.assertEqual(self.membership.expires_on, self.today + timedelta(days=50))
+
+    def test_pause_and_resume_push_the_remaining_days_back(self):
+        self.backdate(10)
+        pause(self.membership)
+        Membership.objects.filter(pk=self.membership.pk).update(paused_on=self.today - timedelta(days=5))
+        self.membership.refresh_from_db()
+        self.assertEqual(self.membership.days_remaining, 25)  # frozen at the pause
+
+        resume(self.membership)
+        self.membership.refresh_from_db()
+        self.assertIsNone(self.membership.paused_on)
+        self.assertEqual(self.membership.expires_on, self.today + timedelta(days=25))
+        self.assertEqual(self.membership.current_period.start_date, self.today)
+        self.assertIn(("pause", "basic", self.today - timedelta(days=5), self.today), self.periods())
+
+    def test_renew_expiring(self):
+        Membership.objects.filter(pk=self.membership.pk).update(auto_renew=True)
+        self.assertEqual(renew_expiring(self.today + timedelta(days=10)), 0)
+        self.assertEqual(renew_expiring(self.today + timedelta(days=30)), 1)
+        self.membership.refresh_from_db()
+        self.assertEqual(self.membership.expires_on, self.today + timedelta(days=60))
+        self.assertEqual(self.membership.current_period.kind, "signup")
+        self.assertEqual(MembershipPeriod.objects.filter(kind="renewal").count(), 1)
+
+
+class FlakyBackend(EmailNotificationBackend):
+    """Fails every message to ``failing``."""
+
+    failing = set()
+
+    def send(self, recipient, subject, body):
+        if recipient in self.failing:
+            raise OSError("SMTP said no")
+        super().send(recipient, subject, body)
+
+
+@override_settings(NOTIFICATION_RATE_LIMIT=0, NOTIFICATION_MAX_RETRIES=1, NOTIFICATION_RETRY_BACKOFF=0)
+class ExpiryNoticeTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        self.memberships = {}
+        for name, days_left in (("ana", 7), ("bruno", 5), ("carla", 1), ("dario", 20)):
+            user = User.objects.create_user(name, email=f"{name}@example.com")
+            self.memberships[name] = start_membership(user, location, "basic", days_left)
+
+    def send(self, days_before, min_days=0, failing=(), today=None):
+        FlakyBackend.failing = set(failing)
+        if not failing:
+            return send_expiry_notices(days_before, min_days=min_days, today=today, backend=FlakyBackend())
+        with self.assertLogs("main.notifications", "ERROR"):
+            return send_expiry_notices(days_before, min_days=min_days, today=today, backend=FlakyBackend())
+
+    def recipients(self):
+        return sorted(message.to[0] for message in mail.outbox)
+
+    def test_notices_cover_every_day_up_to_the_next_one(self):
+        self.assertEqual(self.send(7, min_days=1), {"sent": 2, "failed": 0})
+        self.assertEqual(self.recipients(), ["ana@example.com", "bruno@example.com"])
+        self.assertEqual(self.send(1), {"sent": 1, "failed": 0})
+        # Nobody is notified twice for the same expiry
+        self.assertEqual(self.send(7, min_days=1), {"sent": 0, "failed": 0})
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_notice_is_retried_by_the_next_run_alone(self):
+        self.assertEqual(self.send(7, min_days=1, failing={"ana@example.com"}), {"sent": 1, "failed": 1})
+        self.assertEqual(self.recipients(), ["bruno@example.com"])
+        log = NotificationLog.objects.get(membership=self.memberships["ana"])
+        self.assertEqual((log.status, log.attempts), ("failed", 1))
+
+        # Next day: only the failed one goes out again
+        self.assertEqual(self.send(7, min_days=1, today=self.today + timedelta(days=1)), {"sent": 1, "failed": 0})
+        self.assertEqual(self.recipients(), ["ana@example.com", "bruno@example.com"])
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.attempts), ("sent", 2))
+
+    def test_deactivated_users_are_skipped(self):
+        User.objects.filter(username="bruno").update(is_active=False)
+        self.assertEqual(self.send(7, min_days=1), {"sent": 1, "failed": 0})
+        self.assertEqual(self.recipients(), ["ana@example.com"])
+
+    @override_settings(NOTIFICATION_RATE_LIMIT=1)
+    def test_command_rate_limit_overrides_the_setting(self):
+        with mock.patch("main.notifications.time.sleep") as sleep:
+            call_command("send_expiry_notices", "--days", "7", "--rate-limit", "0", stdout=StringIO())
+        sleep.assert_not_called()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_body_shows_the_last_covered_day(self):
+        self.send(1)
+        self.assertIn(f"valid through {date_format(self.today)}, that's today", mail.outbox[0].body)
+
+
+@override_settings(
+    PROFILING_ENABLED=True,
+    PROFILING_KEEP=2,
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",  # no manifest in tests
+)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        self.admin = User.objects.create_user("boss")
+        self.admin.profile.is_admin = True
+        self.admin.profile.save()
+        self.client.force_login(self.admin)
+
+    def test_admin_profiles_a_request_and_downloads_it(self):
+        response = self.client.get("/admin-panel/?profile=cprofile")
+        profile = RequestProfile.objects.get(pk=response["X-Profile"])
+        self.assertEqual((profile.method, profile.path, profile.mode), ("GET", "/admin-panel/", "cprofile"))
+
+        download = self.client.get(f"/admin-panel/profiles/{profile.pk}/")
+        self.assertEqual(download.content, bytes(profile.data))
+        self.assertIn(".pstats", download["Content-Disposition"])
+
+        for _ in range(2):
+            self.client.get("/admin-panel/", HTTP_X_PROFILE="sample")
+        self.assertEqual(RequestProfile.objects.count(), 2)  # PROFILING_KEEP
+
+    def test_non_admins_cannot_profile(self):
+        self.client.force_login(User.objects.create_user("member"))
+        self.assertNotIn("X-Profile", self.client.get("/my-routines/?profile=cprofile"))
+
+    def test_busy_cprofile_serves_the_request_unprofiled(self):
+        with profiling._cprofile_lock:
+            result, data = profiling.profile_call("cprofile", "/", sum, [1, 2])
+        self.assertEqual((result, data), (3, None))
+
+
+@override_settings(SYNC_PAGE_SIZE=3)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        instructor = Instructor.objects.create(user=User.objects.create_user("coach"), location=location)
+        self.routines = [
+            Routine.objects.create(name=f"Routine {i}", description="", instructor=instructor, location=location)
+            for i in range(4)
+        ]
+        self.member = User.objects.create_user("member")
+        other = User.objects.create_user("other")
+        self.routines[0].clients.add(self.member.profile, other.profile)
+
+    def dump(self, user):
+        pages, page = [], None
+        while True:
+            pages.append(full_dump(user, page))
+            if pages[-1]["next"] is None:
+                return pages
+            page = parse_page(pages[-1]["next"])
+
+    def test_full_dump_is_paged(self):
+        pages = self.dump(self.member)
+        self.assertTrue(all(sum(map(len, p["changes"].values())) <= 3 for p in pages))
+        self.assertTrue(all(p["cursor"] is None for p in pages[:-1]))
+        self.assertIsNotNone(pages[-1]["cursor"])
+        routine_ids = [row["id"] for p in pages for row in p["changes"]["routine"]]
+        self.assertEqual(routine_ids, [routine.pk for routine in self.routines])
+
+    def test_members_only_see_their_own_enrollment(self):
+        routines = {row["id"]: row for p in self.dump(self.member) for row in p["changes"]["routine"]}
+        self.assertEqual(routines[self.routines[0].pk]["clients"], [self.member.profile.pk])
+        self.assertEqual(routines[self.routines[1].pk]["clients"], [])
+
+    def test_cursor_resends_recent_rows(self):
+        cursor = parse_cursor(self.dump(self.member)[-1]["cursor"])
+        # Rows saved just before the dump came back are sent again
+        changes = changes_since(cursor, self.member)["changes"]
+        self.assertEqual(len(changes["routine"]), 4)
+        self.assertEqual(changes["membership"], [])
+
+    def test_members_only_see_their_own_private_tombstones(self):
+        location = Location.objects.get(slug="centro")
+        cursor = timezone.now() - timedelta(seconds=1)
+        own = Membership.objects.create(user=self.member, location=location, plan_type="basic")
+        theirs = Membership.objects.create(user=User.objects.get(username="other"), location=location, plan_type="basic")
+        own_id, their_id, other_profile, routine_id = own.pk, theirs.pk, theirs.user.profile.pk, self.routines[3].pk
+        own.delete()
+        theirs.user.delete()
+        self.routines[3].delete()
+
+        def deleted(user):
+            return {(row["model"], row["object_id"]) for row in changes_since(cursor, user)["changes"]["deleted"]}
+
+        self.assertEqual(deleted(self.member), {("membership", own_id), ("routine", routine_id)})
+        admin = User.objects.create_user("boss")
+        admin.profile.is_admin = True
+        admin.profile.save()
+        self.assertLessEqual({("membership", their_id), ("userprofile", other_profile)}, deleted(admin))
+
+
+@override_settings(
+    RATELIMITS={"login": {"ip": (3, 60), "username": (2, 60)}},
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_counts_until_the_limit(self):
+        self.assertEqual([hit("test", 2, 60) for _ in range(3)], [False, False, True])
+        self.assertFalse(hit("other", 2, 60))
+
+    def test_login_is_throttled_per_username_and_ip(self):
+        def login(username):
+            return self.client.post("/login/", {"username": username, "password": "wrong"})
+
+        self.assertEqual([login("ana").status_code for _ in range(3)], [200, 200, 429])
+        # A fresh username still counts against the IP limit
+        response = login("bruno")
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, "Too many login attempts", count=1, status_code=429)
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=180)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        instructor = Instructor.objects.create(user=User.objects.create_user("coach"), location=self.location)
+        self.routine = Routine.objects.create(name="Yoga", description="", instructor=instructor, location=self.location)
+
+    def member(self, name, days_ago, auto_renew=False):
+        """A member whose 30-day membership started ``days_ago`` days ago."""
+        user = User.objects.create_user(name)
+        membership = start_membership(user, self.location, "basic", 30, auto_renew=auto_renew)
+        shift = timedelta(days=days_ago)
+        membership.periods.update(start_date=F("start_date") - shift, end_date=F("end_date") - shift)
+        Membership.objects.filter(pk=membership.pk).update(expires_on=F("expires_on") - shift)
+        self.routine.clients.add(user.profile)
+        return user
+
+    def test_archivable_users(self):
+        lapsed = self.member("lapsed", 300)
+        self.member("recent", 100)
+        self.member("renews", 300, auto_renew=True)
+        admin = self.member("admin", 300)
+        UserProfile.objects.filter(user=admin).update(is_admin=True)
+        inactive = User.objects.create_user("inactive", is_active=False)
+
+        self.assertEqual(sorted(archivable_user_ids()), sorted([lapsed.pk, inactive.pk]))
+
+    def test_archive_moves_history_and_restore_brings_the_profile_back(self):
+        user = self.member("lapsed", 300)
+        self.member("active", 0)
+        membership_id = user.membership.pk
+
+        self.assertEqual(archive_members([user.pk]), 1)
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+        self.assertFalse(Membership.objects.filter(user=user).exists())
+        self.assertEqual(ArchivedMembership.objects.get().pk, membership_id)
+        self.assertEqual(ArchivedMembershipPeriod.objects.get().membership_id, membership_id)
+        self.assertEqual(ArchivedEnrollment.objects.get().routine_id, self.routine.pk)
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list("model", "user_id")),
+            [("membership", user.pk), ("userprofile", user.pk)],
+        )
+        self.routine.refresh_from_db()
+        self.assertEqual(self.routine.client_count, 1)
+
+        self.assertEqual(restore_member(user), 1)
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        self.assertEqual(restore_member(user), 0)
+
+
+class ReportTests(TestCase):
+    """main.reports on a small history with known answers."""
+
+    today = date(2026, 3, 15)
+
+    def setUp(self):
+        cache.clear()
+        location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        history = {
+            "ana": [("signup", "basic", date(2026, 1, 1), 30)],
+            "bruno": [("signup", "premium", date(2026, 1, 10), 30), ("renewal", "premium", date(2026, 2, 9), 30)],
+            "carla": [("signup", "vip", date(2026, 2, 1), 90)],
+        }
+        for name, periods in history.items():
+            membership = Membership.objects.create(
+                user=User.objects.create_user(name), location=location, plan_type=periods[0][1],
+            )
+            for kind, plan_type, start, days in periods:
+                MembershipPeriod.objects.create(
+                    membership=membership, kind=kind, plan_type=plan_type,
+                    start_date=start, end_date=start + timedelta(days=days), duration_days=days,
+                )
+        self.location = location
+
+    def test_cohort_retention(self):
+        table = reports.cohort_retention(today=self.today)
+        self.assertEqual(table.header, ["cohort", "members", "month 1", "month 2"])
+        self.assertEqual(table.rows, [["2026-01", 2, 50.0, 50.0], ["2026-02", 1, 100.0, ""]])
+
+    def test_active_member_not_churned_before_anniversary(self):
+        # Joined on the 20th, still covered; a month hasn't passed yet on the 15th
+        membership = Membership.objects.create(
+            user=User.objects.create_user("dani"), location=self.location, plan_type="basic",
+        )
+        MembershipPeriod.objects.create(
+            membership=membership, kind="signup", plan_type="basic",
+            start_date=date(2026, 2, 20), end_date=date(2026, 3, 22), duration_days=30,
+        )
+        rows = reports.cohort_retention(today=self.today).rows
+        self.assertEqual(rows[1], ["2026-02", 2, 100.0, ""])
+
+    def test_churn(self):
+        self.assertEqual(reports.churn(today=self.today).rows, [
+            ["2026-01", 0, 0, ""],
+            ["2026-02", 1, 0, 0.0],
+            ["2026-03", 2, 1, 50.0],
+        ])
+
+    def test_revenue_by_plan(self):
+        D = Decimal
+        self.assertEqual(reports.revenue_by_plan(today=self.today).rows, [
+            ["2026-01", D("20.00"), D("35.00"), D("0.00"), D("55.00"), D("55.00")],
+            ["2026-02", D("0.00"), D("35.00"), D("180.00"), D("215.00"), D("270.00")],
+        ])
+
+    def test_filters(self):
+        D = Decimal
+        self.assertEqual(reports.cohort_retention(plan="premium", today=self.today).rows[0][:2], ["2026-01", 1])
+        self.assertEqual(
+            reports.revenue_by_plan(duration=90).rows,
+            [["2026-02", D("0.00"), D("0.00"), D("180.00"), D("180.00"), D("180.00")]],
+        )
+        # renew() and change_plan() overwrite Membership.duration_days; the
+        # filter goes by the periods
+        Membership.objects.update(duration_days=365)
+        self.assertEqual(len(reports.members(duration=30)), 2)
+        self.assertEqual(reports.revenue_by_plan(duration=365).rows, [])
+        self.assertEqual(
+            reports.get_report("revenue", plan="vip").rows,
+            [["2026-02", Decimal("180.00"), Decimal("180.00"), Decimal("180.00")]],
+        )
+
+
+@override_settings(OCCUPANCY_BACKEND="memory", OCCUPANCY_STREAM_SECONDS=0.2, SYNC_CURSOR_MARGIN=60)
+class OccupancyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        other = Location.objects.create(name="Norte", slug="norte", city="Mendoza")
+        instructor = Instructor.objects.create(user=User.objects.create_user("coach"), location=self.location)
+        self.routine = Routine.objects.create(name="Yoga", description="", instructor=instructor, location=self.location)
+        self.other = Routine.objects.create(name="Box", description="", instructor=instructor, location=other)
+
+    def test_poll_cursor_rereads_late_commits(self):
+        published = {}
+        cursor, changes = occupancy._changed_since(timezone.now() - timedelta(hours=1), published)
+        self.assertEqual(len(changes), 2)
+
+        # Saved before that read but committed after it
+        Routine.objects.filter(pk=self.routine.pk).update(
+            client_count=4, updated_at=timezone.now() - timedelta(seconds=10),
+        )
+        cursor, changes = occupancy._changed_since(cursor, published)
+        self.assertEqual(changes, [(self.location.pk, self.routine.pk, 4)])
+        # Still inside the margin, but already published
+        self.assertEqual(occupancy._changed_since(cursor, published)[1], [])
+
+    async def test_stream_sends_snapshot_then_own_branch_changes(self):
+        events = []
+        async for chunk in occupancy.stream(self.location.pk, {self.routine.pk: 0}):
+            events.append(chunk)
+            if len(events) == 2:
+                occupancy.hub.publish([(self.location.pk, self.routine.pk, 1), (self.other.location_id, self.other.pk, 7)])
+        self.assertEqual(events[:3], [
+            "retry: 5000\n\n",
+            occupancy.event({self.routine.pk: 0}),
+            occupancy.event({self.routine.pk: 1}),
+        ])
+        # Timed out after OCCUPANCY_STREAM_SECONDS and left the hub
+        self.assertEqual(events[3:], [": keep-alive\n\n"])
+        self.assertEqual(occupancy.hub._subscribers, {})
+
+    async def test_events_view(self):
+        response = await self.async_client.get("/my-routines/occupancy/")
+        self.assertEqual(response.status_code, 403)
+
+        user = await sync_to_async(User.objects.create_user)("ana")
+        await sync_to_async(Membership.objects.create)(user=user, location=self.location, plan_type="basic")
+        await sync_to_async(self.async_client.force_login)(user)
+        response = await self.async_client.get("/my-routines/occupancy/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = [chunk async for chunk in response.streaming_content]
+        self.assertIn(occupancy.event({self.routine.pk: 0}).encode(), body)
+
+
+@override_settings(TEMPLATES=[{
+    "BACKEND": "main.templating.TimedDjangoTemplates",
+    "APP_DIRS": False,
+    "OPTIONS": {
+        "loaders": [("django.template.loaders.cached.Loader", ["django.template.loaders.app_directories.Loader"])],
+    },
+}])
+class TemplateWarmupTests(TestCase):
+    def test_warm_templates_fills_the_cached_loader(self):
+        loader = engines.all()[0].engine.template_loaders[0]
+        self.assertEqual(loader.get_template_cache, {})
+
+        timings = warm_templates()
+        self.assertEqual(sorted(timings), app_template_names())
+        self.assertLessEqual(set(app_template_names()), set(loader.get_template_cache))
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class LocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.centro = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        self.norte = Location.objects.create(name="Norte", slug="norte", city="Mendoza")
+        self.admin = User.objects.create_user("boss")
+        self.admin.profile.is_admin = True
+        self.admin.profile.save()
+        self.client.force_login(self.admin)
+        self.client.post("/locations/switch/", {"location": self.centro.pk})
+
+        self.routines, self.exercises, self.instructors = {}, {}, {}
+        for location in (self.centro, self.norte):
+            instructor = Instructor.objects.create(user=User.objects.create_user(f"coach-{location.slug}"), location=location)
+            routine = Routine.objects.create(name=f"Yoga {location.name}", description="", instructor=instructor, location=location)
+            self.instructors[location.slug] = instructor
+            self.routines[location.slug] = routine
+            self.exercises[location.slug] = Exercise.objects.create(routine=routine, name="Stretch", description="")
+
+    def location_of(self, client):
+        return client.get("/about/").wsgi_request.location
+
+    def test_middleware_picks_switcher_then_membership_then_default(self):
+        self.assertEqual(self.location_of(self.client), self.centro)
+
+        member = User.objects.create_user("ana")
+        Membership.objects.create(user=member, location=self.norte, plan_type="basic")
+        self.client.force_login(member)
+        self.assertEqual(self.location_of(self.client), self.norte)
+
+        self.client.logout()
+        self.assertEqual(self.location_of(self.client).slug, settings.DEFAULT_LOCATION)
+
+    def test_other_branch_rows_are_not_found(self):
+        routine, exercise = self.routines["norte"], self.exercises["norte"]
+        for url in (
+            f"/routines/edit/{routine.pk}/",
+            f"/routines/delete/{routine.pk}/",
+            f"/routines/clone/{routine.pk}/",
+            f"/routines/{routine.pk}/exercises/",
+            f"/exercises/edit/{exercise.pk}/",
+            f"/exercises/delete/{exercise.pk}/",
+            f"/instructors/edit/{self.instructors['norte'].pk}/",
+            f"/instructors/delete/{self.instructors['norte'].pk}/",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.post(url).status_code, 404)
+
+        self.client.post("/routines/bulk-delete/", {"selected": [routine.pk]})
+        self.client.post("/exercises/bulk-delete/", {"selected": [exercise.pk]})
+        self.assertTrue(Routine.objects.filter(pk=routine.pk).exists())
+        self.assertTrue(Exercise.objects.filter(pk=exercise.pk).exists())
+
+    def test_lists_and_choices_only_show_the_branch(self):
+        response = self.client.get("/exercises/")
+        self.assertEqual(list(response.context["exercises"]), [self.exercises["centro"]])
+
+        for location in (self.centro, self.norte):
+            user = User.objects.create_user(f"member-{location.slug}")
+            Membership.objects.create(user=user, location=location, plan_type="basic")
+        results = self.client.get("/routines/client-search/", {"q": "member"}).json()["results"]
+        self.assertEqual([row["text"] for row in results], [str(User.objects.get(username="member-centro").profile)])
+
+        form = ExerciseForm(location=self.centro)
+        self.assertEqual(list(form.fields["routine"].queryset), [self.routines["centro"]])
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class InstructorRosterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        self.members = [User.objects.create_user(f"member{i}").profile for i in range(3)]
+        admin = User.objects.create_user("boss")
+        admin.profile.is_admin = True
+        admin.profile.save()
+        self.client.force_login(admin)
+        self.client.post("/locations/switch/", {"location": self.location.pk})
+
+    def add_instructor(self, name):
+        instructor = Instructor.objects.create(user=User.objects.create_user(name), location=self.location)
+        for i in range(2):
+            routine = Routine.objects.create(name=f"{name} {i}", description="", instructor=instructor, location=self.location)
+            Exercise.objects.create(routine=routine, name="Stretch", description="")
+            routine.clients.add(*self.members)
+
+    def test_query_count_does_not_grow_with_instructors(self):
+        self.add_instructor("coach0")
+        with CaptureQueriesContext(connection) as one:
+            response = self.client.get("/instructors/roster/")
+        self.assertEqual(response.context["instructors"][0].client_count, 3)
+
+        for i in range(1, 6):
+            self.add_instructor(f"coach{i}")
+        with self.assertNumQueries(len(one)):
+            response = self.client.get("/instructors/roster/")
+        self.assertEqual(len(response.context["instructors"]), 6)
+
+
+class RoutineFormTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        instructor = Instructor.objects.create(user=User.objects.create_user("coach"), location=self.location)
+        self.routine = Routine.objects.create(name="Yoga", description="", instructor=instructor, location=self.location)
+        self.profiles = [User.objects.create_user(f"client{i:02d}").profile for i in range(25)]
+        for profile in self.profiles:
+            Membership.objects.create(user=profile.user, location=self.location, plan_type="basic")
+
+    def test_clients_are_saved_as_a_diff(self):
+        self.routine.clients.add(*self.profiles[:3])
+        sent = []
+
+        def record(action, pk_set, **kwargs):
+            if action.startswith("post_"):
+                sent.append((action, pk_set))
+
+        m2m_changed.connect(record, sender=Routine.clients.through)
+        self.addCleanup(m2m_changed.disconnect, record, sender=Routine.clients.through)
+        form = RoutineForm({
+            "name": "Yoga", "description": "x", "instructor": self.routine.instructor_id, "duration_minutes": 60,
+            "clients": [profile.pk for profile in self.profiles[1:5]],
+        }, instance=self.routine)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        self.assertEqual(sorted(sent), [
+            ("post_add", {self.profiles[3].pk, self.profiles[4].pk}),
+            ("post_remove", {self.profiles[0].pk}),
+        ])
+        self.routine.refresh_from_db()
+        self.assertEqual(self.routine.client_count, 4)
+
+    def test_client_search_needs_two_characters_and_caps_results(self):
+        admin = User.objects.create_user("boss")
+        admin.profile.is_admin = True
+        admin.profile.save()
+        self.client.force_login(admin)
+        self.client.post("/locations/switch/", {"location": self.location.pk})
+
+        def search(term):
+            return self.client.get("/routines/client-search/", {"q": term}).json()["results"]
+
+        self.assertEqual(search("c"), [])
+        results = search("cl")
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0], {"id": self.profiles[0].pk, "text": str(self.profiles[0])})
+        self.assertEqual(len(search("client2")), 5)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(name="Centro", slug="centro", city="Mendoza")
+        instructor = Instructor.objects.create(user=User.objects.create_user("coach"), location=self.location)
+        self.a, self.b, self.c, self.d = [
+            Routine.objects.create(name=name, description="", instructor=instructor, location=self.location)
+            for name in "ABCD"
+        ]
+        # A-B share two of A's three clients, A-C one; D shares none
+        for name, routines in (("p0", "ab"), ("p1", "ab"), ("p2", "ac"), ("p3", "d")):
+            User.objects.create_user(name).profile.routines.add(*[getattr(self, r) for r in routines])
+
+    def neighbors(self):
+        return sorted(RoutineNeighbor.objects.values_list("routine__name", "neighbor__name"))
+
+    def test_top_k_keeps_the_most_similar(self):
+        self.assertEqual(build_neighbors(top_k=1), 3)
+        self.assertEqual(self.neighbors(), [("A", "B"), ("B", "A"), ("C", "A")])
+
+        self.assertEqual(build_neighbors(top_k=10), 4)  # rebuilt, not appended
+        score = RoutineNeighbor.objects.get(routine=self.a, neighbor=self.b).score
+        self.assertAlmostEqual(score, 2 / 6 ** 0.5)
+
+    def test_recommendations_best_first_without_enrolled(self):
+        build_neighbors()
+        self.assertEqual(recommended_ids([self.a.pk]), [self.b.pk, self.c.pk])
+        self.assertEqual(recommended_ids([self.a.pk, self.b.pk]), [self.c.pk])
+        self.assertEqual(recommended_ids([self.d.pk]), [])
+        self.assertEqual(recommended_ids([]), [])
+
+        other = Location.objects.create(name="Norte", slug="norte", city="Mendoza")
+        Routine.objects.filter(pk=self.c.pk).update(location=other)
+        self.assertEqual(recommended_ids([self.a.pk], location=self.location), [self.b.pk])
+
+    def test_deleting_a_routine_drops_its_neighbor_rows(self):
+        build_neighbors()
+        delete_routines([self.b.pk])
+        self.assertEqual(self.neighbors(), [("A", "C"), ("C", "A")])
+
+
+class SessionTests(TestCase):
+    def test_unknown_session_mode_is_a_configuration_error(self):
+        with mock.patch.dict(os.environ, {"SESSION_MODE": "redis"}):
+            with self.assertRaisesMessage(ImproperlyConfigured, "db, cached_db, signed_cookies"):
+                runpy.run_path(settings.BASE_DIR / "website" / "settings.py")
+
+    def test_purge_sessions_deletes_only_expired_ones(self):
+        for days in (-2, -1, 1):
+            session = SessionStore()
+            session.set_expiry(timedelta(days=days))
+            session.save()
+        live = Session.objects.get(expire_date__gt=timezone.now()).pk
+
+        out = StringIO()
+        call_command("purge_sessions", batch_size=1, stdout=out)
+        self.assertEqual(list(Session.objects.values_list("pk", flat=True)), [live])
+        self.assertIn("Deleted 2 expired sessions", out.getvalue())
+
+    @override_settings(SESSION_MODE="signed_cookies")
+    def test_purge_sessions_has_nothing_to_do_with_signed_cookies(self):
+        out = StringIO()
+        call_command("purge_sessions", stdout=out)
+        self.assertIn("nothing to purge", out.getvalue())
+
+
+class StaticMinifyTests(TestCase):
+    def test_minify_css_drops_comments_and_keeps_strings(self):
+        source = """
+            /* header */
+            .a::before {
+                content: "/* not a comment */  x";
+                margin : 0 ;
+            }
+            .b { font-family: 'Open  Sans'; }
+        """
+        self.assertEqual(
+            minify_css(source),
+            '.a::before{content: "/* not a comment */  x";margin : 0}.b{font-family: \'Open  Sans\'}',
+        )
+
+    def test_minify_js_drops_indentation_and_comment_lines(self):
+        source = """
+            // setup
+            const url = "https://example.com"; // keep the URL
+            if (ok) {
+                send(url);
+            }
+        """
+        self.assertEqual(
+            minify_js(source),
+            'const url = "https://example.com"; // keep the URL\nif (ok) {\nsend(url);\n}',
+        )
+
+    def test_collectstatic_hashes_the_minified_files_under_their_own_names(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(source, "minify-test"))
+            for name, content in (("site.css", "a {  color : red ; }\n/* x */"), ("app.js", "// x\n  go();\n")):
+                with open(os.path.join(source, "minify-test", name), "w") as f:
+                    f.write(content)
+
+            with override_settings(
+                STATICFILES_STORAGE="main.storage.OptimizedStaticFilesStorage",
+                STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+                STATICFILES_DIRS=[source], STATIC_ROOT=root,
+            ):
+                call_command("collectstatic", interactive=False, verbosity=0)
+
+            with open(os.path.join(root, "staticfiles.json")) as f:
+                paths = json.load(f)["paths"]
+            for name, minified in (("minify-test/site.css", b"a{color : red}"), ("minify-test/app.js", b"go();")):
+                with self.subTest(name=name):
+                    root_name, ext = os.path.splitext(name)
+                    digest = hashlib.md5(minified).hexdigest()[:12]
+                    self.assertEqual(paths[name], f"{root_name}.{digest}{ext}")
+                    with open(os.path.join(root, paths[name]), "rb") as f:
+                        self.assertEqual(f.read(), minified)
@@ -11,29 +11,42 @@ urlpatterns = [
     path('register/', views.register_view, name="register"),
     path('logout/', views.logout_view, name='logout'),
     path('add-membership/', views.add_membership_view, name='add-membership'),
+    path('membership/', views.membership_view, name='membership'),
     # path('add-routine/', views.add-routine_view, name='add-routine')
 
 
      # Admin panel
     path('admin-panel/', views.admin_panel, name='admin-panel'),
+    path('admin-panel/template-metrics/', views.template_metrics, name='template-metrics'),
+    path('admin-panel/reports/', views.reports_view, name='reports'),
+    path('admin-panel/reports/<str:name>.csv', views.report_csv, name='report-csv'),
+    path('admin-panel/profiles/', views.profiles_view, name='profiles'),
+    path('admin-panel/profiles/<int:id>/', views.profile_download, name='profile-download'),
 
     # Routines CRUD
     path('routines/', views.routine_list, name='routine-list'),
     path('routines/add/', views.add_routine_view, name='add-routine'),
     path('routines/edit/<int:id>/', views.edit_routine, name='edit-routine'),
     path('routines/delete/<int:id>/', views.delete_routine, name='delete-routine'),
+    path('routines/bulk-delete/', views.bulk_delete_routines, name='bulk-delete-routines'),
+    path('routines/clone/<int:id>/', views.clone_routine_view, name='clone-routine'),
+    path('routines/client-search/', views.client_search, name='client-search'),
+    path('routines/<int:routine_id>/exercises/', views.routine_exercises, name='routine-exercises'),
 
     # Exercises CRUD
     path('exercises/', views.exercise_list, name='exercise-list'),
     path('exercises/add/', views.add_exercise, name='add-exercise'),
     path('exercises/edit/<int:id>/', views.edit_exercise, name='edit-exercise'),
     path('exercises/delete/<int:id>/', views.delete_exercise, name='delete-exercise'),
+    path('exercises/bulk-delete/', views.bulk_delete_exercises, name='bulk-delete-exercises'),
 
     # Instructors CRUD
     path('instructors/', views.instructor_list, name='instructor-list'),
     path('instructors/add/', views.add_instructor, name='add-instructor'),
     path('instructors/edit/<int:id>/', views.edit_instructor, name='edit-instructor'),
     path('instructors/delete/<int:id>/', views.delete_instructor, name='delete-instructor'),
+    path('instructors/roster/', views.instructor_roster, name='instructor-roster'),
+    path('locations/switch/', views.switch_location_view, name='switch-location'),
 
     path('delete-user/<int:user_id>/', views.delete_user, name='delete-user'),
     path("members/", views.members_list, name="members-list"),
@@ -46,6 +59,10 @@ urlpatterns = [
         views.toggle_routine_enrollment,
         name="toggle-routine-enrollment",
     ),
+    path("my-routines/occupancy/", views.occupancy_events, name="occupancy-events"),
+
+    # Incremental sync for mobile/kiosk clients
+    path("sync/changes/", views.change_feed, name="change-feed"),
 
 
 ]
\ No newline at end of file
@@ -1,14 +1,20 @@
+from datetime import date
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Length
 
-import requests
-from datetime import datetime
-from website import settings
 from .forms import (
     CustomUserCreationForm,
     NewMembershipForm,
@@ -17,9 +23,26 @@ from .forms import (
     InstructorForm,
     AdminUserForm,
     AdminUserProfileForm,
+    ExerciseFormSet,
+    ChangePlanForm,
+    ReportFilterForm,
 )
-from .models import Instructor, Membership, Routine, Exercise, UserProfile
+from .models import Instructor, Membership, Routine, Exercise, UserProfile, RequestProfile
 from django.contrib.auth import get_user_model
+from .sync import changes_since, full_dump, parse_cursor, parse_page
+from .templating import render_stats
+from .ratelimit import is_rate_limited
+from .weather import current_weather, forecast
+from .locations import switch_location
+from . import occupancy
+from .reports import REPORTS, get_report, write_csv
+from .recommendations import recommended_ids
+from .queue import enqueue
+from .memberships import start_membership, renew, change_plan, pause, resume
+from .services import (
+    delete_exercises, clone_routine, save_exercise_formset,
+    routine_delete_counts, instructor_delete_counts,
+)
 
 
 # =========================
@@ -38,6 +61,16 @@ def admin_required(view_func):
     return _wrapped
 
 
+def _selected_ids(request):
+    """Ids of the rows ticked in a bulk-action form."""
+    return [pk for pk in request.POST.getlist('selected') if pk.isdigit()]
+
+
+def _city(request):
+    """Weather city of the branch being viewed (set by LocationMiddleware)."""
+    return request.location.city if request.location else None
+
+
 # =========================
 # PUBLIC / AUTH VIEWS
 # =========================
@@ -47,33 +80,16 @@ def home(request):
     user = request.user  # Get the current user
     role = None
     routines = None
-    instructors = Instructor.objects.all()  # Show all instructors on home page
+    # Show the instructors of the branch being viewed
+    instructors = Instructor.objects.for_location(request.location)
 
     if user.is_authenticated:
         role = "admin" if hasattr(user, "profile") and user.profile.is_admin else "client"
 
-    # weather data
-    city = 'Mendoza'  # Default city variable
-    api_key = settings.OPENWEATHER_API_KEY  # OpenWeatherMap API key
-    url = f'http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric'
-    weather_data = {}  # Variable to store weather data
-    error_message = None
-
-    # Calling the OpenWeatherMap API to get current weather data
-    try:
-        response = requests.get(url).json()
-        if response.get('cod') != 200:
-            error_message = response.get('message', 'Error retrieving weather data.')
-
-        weather_data = {
-            'city': response.get('name', city),
-            'temperature': response.get('main', {}).get('temp'),
-            'description': response.get('weather', [{}])[0].get('description'),
-            'wind_speed': response.get('wind', {}).get('speed'),
-            'icon': response.get('weather', [{}])[0].get('icon'),
-        }
-    except ValueError as e:
-        error_message = str(e)
+    # weather data (cached, refreshed in the background)
+    weather = current_weather(_city(request))
+    weather_data = weather['weather_data']
+    error_message = weather['error_message']
 
     context = {
         "user": user,
@@ -97,55 +113,26 @@ def dashboard(request):
     elif role == "client" and hasattr(user, "profile"):
         # For regular clients: show routines they are enrolled in
         routines = user.profile.routines.all()
+    if routines is not None:
+        routines = routines.select_related('instructor__user').prefetch_related('exercises')
 
     # Memberships info
     membership_types = Membership.PLAN_CHOICES
 
-    # All members
-    all_memberships = Membership.objects.select_related("user").all()
+    # All members of this branch
+    all_memberships = Membership.objects.for_location(request.location).select_related("user")
 
-    # Weather
-    city = 'Mendoza'
-    api_key = settings.OPENWEATHER_API_KEY
-    url = f'http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={api_key}&units=metric'
-    weather_data = {}
-    error_message = None
-
-    try:
-        response = requests.get(url).json()
-        if response.get('cod') != 200:
-            error_message = response.get('message', 'Error retrieving weather data.')
-
-        city_name = response['city']['name']
-        forecast_list = response['list']
-    except ValueError as e:
-        error_message = str(e)
-        city_name = city
-        forecast_list = []
-
-    # Dictionary to store one forecast entry per day
-    daily_forecasts = {}
-
-    for entry in forecast_list:
-        dt_object = datetime.strptime(entry['dt_txt'], '%Y-%m-%d %H:%M:%S')
-        date_key = dt_object.date()
-        if date_key not in daily_forecasts and len(daily_forecasts) < 3:
-            daily_forecasts[date_key] = {
-                'temp': entry['main']['temp'],
-                'description': entry['weather'][0]['description'].capitalize(),
-                'wind_speed': entry['wind']['speed'],
-                'icon_code': entry['weather'][0]['icon'],
-                'day_name': dt_object.strftime('%A'),
-            }
+    # Weather (cached per branch city, refreshed in the background)
+    weather = forecast(_city(request))
 
     context = {
         "role": role,
         "routines": routines,
         "membership_types": membership_types,
         "all_memberships": all_memberships,
-        'city': city_name,
-        'daily_forecasts': list(daily_forecasts.values()),
-        'error_message': error_message,
+        'city': weather['city'],
+        'daily_forecasts': weather['daily_forecasts'],
+        'error_message': weather['error_message'],
     }
 
     return render(request, 'main/dashboard.html', context)
@@ -163,6 +150,9 @@ def login_view(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
 
+    if request.method == "POST" and is_rate_limited(request, "login"):
+        return render(request, "main/login.html", {"form": AuthenticationForm(), "throttled": True}, status=429)
+
     if request.method == "POST":
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
@@ -182,6 +172,9 @@ def register_view(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
 
+    if request.method == "POST" and is_rate_limited(request, "register"):
+        return render(request, "main/register.html", {"form": CustomUserCreationForm(), "throttled": True}, status=429)
+
     if request.method == "POST":
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
@@ -206,12 +199,12 @@ def add_membership_view(request):
     if request.method == "POST":
         form = NewMembershipForm(request.POST)
         if form.is_valid():
-            plan = form.cleaned_data["plan_type"]
-            duration = form.cleaned_data["duration_days"]
-            Membership.objects.create(
-                user=request.user,
-                plan_type=plan,
-                duration_days=duration
+            start_membership(
+                request.user,
+                location=request.location,
+                plan_type=form.cleaned_data["plan_type"],
+                duration_days=int(form.cleaned_data["duration_days"]),
+                auto_renew=form.cleaned_data["auto_renew"],
             )
             return redirect('dashboard')
     else:
@@ -220,6 +213,55 @@ def add_membership_view(request):
     return render(request, 'main/add-membership.html', {"form": form})
 
 
+@login_required
+def membership_view(request):
+    """Member's own plan: history, renew, change plan, pause/resume."""
+    if not hasattr(request.user, "membership"):
+        return redirect('add-membership')
+
+    membership = request.user.membership
+    renew_form = NewMembershipForm(initial={"plan_type": membership.plan_type, "auto_renew": membership.auto_renew})
+    plan_form = ChangePlanForm(initial={"plan_type": membership.plan_type})
+
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "renew":
+            renew_form = NewMembershipForm(request.POST)
+            if renew_form.is_valid():
+                membership.auto_renew = renew_form.cleaned_data["auto_renew"]
+                renew(
+                    membership,
+                    duration_days=int(renew_form.cleaned_data["duration_days"]),
+                    plan_type=renew_form.cleaned_data["plan_type"],
+                )
+                messages.success(request, "Membership renewed.")
+                return redirect('membership')
+        elif action == "change_plan":
+            plan_form = ChangePlanForm(request.POST)
+            if plan_form.is_valid():
+                try:
+                    change_plan(membership, plan_form.cleaned_data["plan_type"])
+                    messages.success(request, "Plan changed.")
+                    return redirect('membership')
+                except ValueError as e:
+                    plan_form.add_error(None, str(e))
+        elif action == "pause":
+            pause(membership)
+            messages.info(request, "Membership paused.")
+            return redirect('membership')
+        elif action == "resume":
+            resume(membership)
+            messages.success(request, "Membership resumed.")
+            return redirect('membership')
+
+    return render(request, 'main/membership.html', {
+        "membership": membership,
+        "periods": membership.periods.all(),
+        "renew_form": renew_form,
+        "plan_form": plan_form,
+    })
+
+
 def logout_view(request):
     logout(request)
     return redirect('home')
@@ -237,32 +279,90 @@ def admin_panel(request):
     return render(request, "main/crud.html")
 
 
+@admin_required
+def template_metrics(request):
+    """Render-time stats per template for this worker process."""
+    return JsonResponse({"templates": render_stats.snapshot()})
+
+
+@admin_required
+def profiles_view(request):
+    """Request profiles saved by ProfilingMiddleware."""
+    return render(request, 'main/profiles.html', {
+        'profiles': RequestProfile.objects.defer('data').annotate(size=Length('data')),
+        'enabled': settings.PROFILING_ENABLED,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    })
+
+
+@admin_required
+def profile_download(request, id):
+    profile = get_object_or_404(RequestProfile, id=id)
+    response = HttpResponse(bytes(profile.data), content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="{profile.filename}"'
+    return response
+
+
+def _report_params(request):
+    """Filters for get_report() from the reports page query string."""
+    form = ReportFilterForm(request.GET or None)
+    filters = form.cleaned_data if form.is_valid() else {}
+    location = None
+    if not filters.get('all_branches') and request.location:
+        location = request.location.pk
+    params = {'plan': filters.get('plan') or None, 'duration': filters.get('duration'), 'location': location}
+    return form, params
+
+
+@admin_required
+def reports_view(request):
+    """Retention cohorts, churn and revenue by plan."""
+    form, params = _report_params(request)
+    tables = [(name, get_report(name, **params)) for name in REPORTS]
+    return render(request, 'main/reports.html', {
+        'form': form,
+        'tables': tables,
+        'query': request.GET.urlencode(),
+    })
+
+
+@admin_required
+def report_csv(request, name):
+    if name not in REPORTS:
+        raise Http404("Unknown report")
+    _, params = _report_params(request)
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{date.today()}.csv"'
+    write_csv(get_report(name, **params), response)
+    return response
+
+
 # =========================
 # ROUTINE CRUD
 # =========================
 
 @admin_required
 def routine_list(request):
-    routines = Routine.objects.select_related('instructor').all()
+    routines = Routine.objects.for_location(request.location).select_related('instructor__user')
     return render(request, 'main/routine_list.html', {'routines': routines})
 
 
 @admin_required
 def add_routine_view(request):
     if request.method == 'POST':
-        form = RoutineForm(request.POST)
+        form = RoutineForm(request.POST, location=request.location)
         if form.is_valid():
             form.save()
             messages.success(request, "Routine created successfully.")
             return redirect('routine-list')
     else:
-        form = RoutineForm()
+        form = RoutineForm(location=request.location)
     return render(request, 'main/add-routine.html', {'form': form})
 
 
 @admin_required
 def edit_routine(request, id):
-    routine = get_object_or_404(Routine, id=id)
+    routine = get_object_or_404(Routine.objects.for_location(request.location), id=id)
     if request.method == 'POST':
         form = RoutineForm(request.POST, instance=routine)
         if form.is_valid():
@@ -274,14 +374,73 @@ def edit_routine(request, id):
     return render(request, 'main/add-routine.html', {'form': form, 'editing': True})
 
 
+@admin_required
+def client_search(request):
+    """
+    Autocomplete source for the routine clients picker.
+    Returns at most 20 members of the branch whose username or name starts
+    with ``q``.
+    """
+    term = request.GET.get('q', '').strip()
+    if len(term) < 2:
+        return JsonResponse({'results': []})
+
+    profiles = (
+        UserProfile.objects
+        .filter(is_admin=False, user__membership__location=request.location)
+        .filter(
+            Q(user__username__istartswith=term)
+            | Q(user__first_name__istartswith=term)
+            | Q(user__last_name__istartswith=term)
+        )
+        .select_related('user')
+        .order_by('user__username')[:20]
+    )
+    return JsonResponse({
+        'results': [{'id': profile.pk, 'text': str(profile)} for profile in profiles]
+    })
+
+
 @admin_required
 def delete_routine(request, id):
-    routine = get_object_or_404(Routine, id=id)
+    routine = get_object_or_404(Routine.objects.for_location(request.location), id=id)
     if request.method == 'POST':
-        routine.delete()
-        messages.success(request, "Routine deleted.")
+        enqueue('delete_routine', routine.id)
+        messages.success(request, "Routine scheduled for deletion.")
         return redirect('routine-list')
-    return render(request, 'main/confirm_delete.html', {'object': routine, 'type': 'Routine'})
+    return render(request, 'main/confirm_delete.html', {
+        'object': routine,
+        'type': 'Routine',
+        'counts': routine_delete_counts([routine.id]),
+    })
+
+
+@admin_required
+def bulk_delete_routines(request):
+    """
+    Delete every routine ticked on the routine list, in the background like
+    delete_routine: with their exercises and enrollments it can be a lot of rows.
+    """
+    if request.method == 'POST':
+        ids = list(
+            Routine.objects.for_location(request.location)
+            .filter(pk__in=_selected_ids(request))
+            .values_list('pk', flat=True)
+        )
+        if ids:
+            enqueue('delete_routine_batch', ids)
+        messages.success(request, f"{len(ids)} routine(s) scheduled for deletion.")
+    return redirect('routine-list')
+
+
+@admin_required
+def clone_routine_view(request, id):
+    routine = get_object_or_404(Routine.objects.for_location(request.location), id=id)
+    if request.method == 'POST':
+        copy = clone_routine(routine)
+        messages.success(request, f"Routine cloned as \"{copy.name}\".")
+        return redirect('edit-routine', id=copy.id)
+    return redirect('routine-list')
 
 
 # =========================
@@ -290,40 +449,40 @@ def delete_routine(request, id):
 
 @admin_required
 def exercise_list(request):
-    exercises = Exercise.objects.select_related('routine').all()
+    exercises = Exercise.objects.for_location(request.location).select_related('routine')
     return render(request, 'main/exercise_list.html', {'exercises': exercises})
 
 
 @admin_required
 def add_exercise(request):
     if request.method == 'POST':
-        form = ExerciseForm(request.POST)
+        form = ExerciseForm(request.POST, location=request.location)
         if form.is_valid():
             form.save()
             messages.success(request, "Exercise created successfully.")
             return redirect('exercise-list')
     else:
-        form = ExerciseForm()
+        form = ExerciseForm(location=request.location)
     return render(request, 'main/add-exercise.html', {'form': form})
 
 
 @admin_required
 def edit_exercise(request, id):
-    exercise = get_object_or_404(Exercise, id=id)
+    exercise = get_object_or_404(Exercise.objects.for_location(request.location), id=id)
     if request.method == 'POST':
-        form = ExerciseForm(request.POST, instance=exercise)
+        form = ExerciseForm(request.POST, instance=exercise, location=request.location)
         if form.is_valid():
             form.save()
             messages.success(request, "Exercise updated successfully.")
             return redirect('exercise-list')
     else:
-        form = ExerciseForm(instance=exercise)
+        form = ExerciseForm(instance=exercise, location=request.location)
     return render(request, 'main/add-exercise.html', {'form': form, 'editing': True})
 
 
 @admin_required
 def delete_exercise(request, id):
-    exercise = get_object_or_404(Exercise, id=id)
+    exercise = get_object_or_404(Exercise.objects.for_location(request.location), id=id)
     if request.method == 'POST':
         exercise.delete()
         messages.success(request, "Exercise deleted.")
@@ -331,32 +490,112 @@ def delete_exercise(request, id):
     return render(request, 'main/confirm_delete.html', {'object': exercise, 'type': 'Exercise'})
 
 
+@admin_required
+def bulk_delete_exercises(request):
+    """Delete every exercise ticked on the exercise list in one go."""
+    if request.method == 'POST':
+        ids = Exercise.objects.for_location(request.location).filter(pk__in=_selected_ids(request))
+        deleted = delete_exercises(ids.values_list('pk', flat=True))
+        messages.success(request, f"{deleted} exercise(s) deleted.")
+    return redirect('exercise-list')
+
+
+@admin_required
+def routine_exercises(request, routine_id):
+    """
+    Create, edit and delete all exercises of one routine in a single POST.
+    """
+    routine = get_object_or_404(Routine.objects.for_location(request.location), id=routine_id)
+    queryset = Exercise.objects.filter(routine=routine).order_by('id')
+    if request.method == 'POST':
+        formset = ExerciseFormSet(request.POST, queryset=queryset)
+        if formset.is_valid():
+            created, updated, deleted = save_exercise_formset(formset, routine)
+            messages.success(
+                request,
+                f"Exercises saved: {created} added, {updated} updated, {deleted} deleted.",
+            )
+            return redirect('exercise-list')
+    else:
+        formset = ExerciseFormSet(queryset=queryset)
+    return render(request, 'main/routine_exercises.html', {'formset': formset, 'routine': routine})
+
+
+# =========================
+# BRANCHES
+# =========================
+
+def switch_location_view(request):
+    """Navbar branch switcher."""
+    if request.method == 'POST':
+        try:
+            location_id = int(request.POST.get('location', ''))
+        except ValueError:
+            location_id = None
+        if not switch_location(request, location_id):
+            messages.error(request, "Unknown branch.")
+
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('home')
+
+
 # =========================
 # INSTRUCTOR CRUD
 # =========================
 
 @admin_required
 def instructor_list(request):
-    instructors = Instructor.objects.select_related('user').all()
+    instructors = Instructor.objects.for_location(request.location).select_related('user')
     return render(request, 'main/instructor_list.html', {'instructors': instructors})
 
 
+@admin_required
+def instructor_roster(request):
+    """
+    Every instructor with their routines and workload. Counts come from
+    annotations and the Routine counter caches, so the page runs the same
+    few queries however many instructors there are.
+    """
+    clients = (
+        Routine.clients.through.objects.filter(routine__instructor=OuterRef('pk'))
+        .values('routine__instructor')
+        .annotate(count=Count('userprofile', distinct=True))
+        .values('count')
+    )
+    routines = Routine.objects.order_by('name')
+    instructors = (
+        Instructor.objects.for_location(request.location)
+        .select_related('user')
+        .annotate(
+            routine_count=Count('routines', distinct=True),
+            enrollment_count=Coalesce(Sum('routines__client_count'), 0),
+            exercise_count=Coalesce(Sum('routines__exercise_count'), 0),
+            client_count=Coalesce(Subquery(clients), 0),
+        )
+        .prefetch_related(Prefetch('routines', queryset=routines))
+        .order_by('user__first_name', 'user__username')
+    )
+    return render(request, 'main/instructor_roster.html', {'instructors': instructors})
+
+
 @admin_required
 def add_instructor(request):
     if request.method == 'POST':
-        form = InstructorForm(request.POST)
+        form = InstructorForm(request.POST, initial={'location': request.location})
         if form.is_valid():
             form.save()
             messages.success(request, "Instructor created successfully.")
             return redirect('instructor-list')
     else:
-        form = InstructorForm()
+        form = InstructorForm(initial={'location': request.location})
     return render(request, 'main/add-instructor.html', {'form': form})
 
 
 @admin_required
 def edit_instructor(request, id):
-    instructor = get_object_or_404(Instructor, id=id)
+    instructor = get_object_or_404(Instructor.objects.for_location(request.location), id=id)
     if request.method == 'POST':
         form = InstructorForm(request.POST, instance=instructor)
         if form.is_valid():
@@ -370,12 +609,16 @@ def edit_instructor(request, id):
 
 @admin_required
 def delete_instructor(request, id):
-    instructor = get_object_or_404(Instructor, id=id)
+    instructor = get_object_or_404(Instructor.objects.for_location(request.location), id=id)
     if request.method == 'POST':
-        instructor.delete()
-        messages.success(request, "Instructor deleted.")
+        enqueue('delete_instructor', instructor.id)
+        messages.success(request, "Instructor scheduled for deletion.")
         return redirect('instructor-list')
-    return render(request, 'main/confirm_delete.html', {'object': instructor, 'type': 'Instructor'})
+    return render(request, 'main/confirm_delete.html', {
+        'object': instructor,
+        'type': 'Instructor',
+        'counts': instructor_delete_counts([instructor.id]),
+    })
 
 @login_required
 def delete_user(request, user_id):
@@ -385,8 +628,12 @@ def delete_user(request, user_id):
     User = get_user_model()
     try:
         user = User.objects.get(id=user_id)
-        user.delete()
-        messages.success(request, "User deleted.")
+        # Soft delete: lock the account right away, then move the member's
+        # history to the archive tables in the background
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        enqueue('archive_user', user.id)
+        messages.success(request, "User deleted. Their history has been archived.")
     except User.DoesNotExist:
         messages.error(request, "User not found.")
 
@@ -395,7 +642,7 @@ def delete_user(request, user_id):
 
 @admin_required
 def members_list(request):
-    all_memberships = Membership.objects.select_related("user").all()
+    all_memberships = Membership.objects.for_location(request.location).select_related("user")
     return render(request, "main/members_list.html", {
         "all_memberships": all_memberships
     })
@@ -409,7 +656,7 @@ def edit_user_profile(request, user_id):
     """
     User = get_user_model()
     user = get_object_or_404(User, id=user_id)
-    profile, created = UserProfile.objects.get_or_create(user=user)
+    profile, created = UserProfile.all_objects.get_or_create(user=user)
 
     if request.method == "POST":
         user_form = AdminUserForm(request.POST, instance=user)
@@ -447,21 +694,35 @@ def client_routines(request):
     user_profile = request.user.profile
     all_routines = (
         Routine.objects
+        .for_location(request.location)
         .select_related("instructor__user")
         .prefetch_related("exercises")
-        .all()
     )
+    by_id = {routine.id: routine for routine in all_routines}
 
     enrolled_ids = set(
         user_profile.routines.values_list("id", flat=True)
     )
 
+    # "Recommended for you": nearest neighbors of what the client already
+    # takes (main/recommendations.py); the most popular routines to start with
+    if enrolled_ids:
+        recommended = [
+            by_id[pk]
+            for pk in recommended_ids(enrolled_ids, request.location)
+            if pk in by_id
+        ]
+    else:
+        recommended = sorted(by_id.values(), key=lambda r: -r.client_count)
+        recommended = [r for r in recommended if r.client_count][:settings.RECOMMENDATION_LIMIT]
+
     return render(
         request,
         "main/client_routines.html",
         {
             "routines": all_routines,
             "enrolled_ids": enrolled_ids,
+            "recommended": recommended,
         },
     )
 
@@ -476,7 +737,7 @@ def toggle_routine_enrollment(request, routine_id):
         return redirect("dashboard")
 
     profile = request.user.profile
-    routine = get_object_or_404(Routine, id=routine_id)
+    routine = get_object_or_404(Routine.objects.for_location(request.location), id=routine_id)
 
     if profile.routines.filter(id=routine_id).exists():
         profile.routines.remove(routine)
@@ -484,5 +745,55 @@ def toggle_routine_enrollment(request, routine_id):
     else:
         profile.routines.add(routine)
         messages.success(request, "Routine added to your plan.")
+    transaction.on_commit(lambda: occupancy.publish_routines([routine.id]))
+
+    return redirect("client-routines")
+
+
+async def occupancy_events(request):
+    """
+    Server-sent events with the enrollment counts of the branch's routines,
+    for the client routine page (see main/occupancy.py).
+    """
+    if not await sync_to_async(lambda: request.user.is_authenticated)():
+        return HttpResponseForbidden("Not allowed")
+    if request.location is None:
+        return HttpResponse(status=204)
+
+    snapshot = await sync_to_async(occupancy.counts_for_location)(request.location.pk)
+    if isinstance(request, ASGIRequest):
+        body = occupancy.stream(request.location.pk, snapshot)
+    else:
+        # No long-lived connections under WSGI: send the counts and let the
+        # browser reconnect after OCCUPANCY_RETRY_MS
+        body = [f"retry: {settings.OCCUPANCY_RETRY_MS}\n\n", occupancy.event(snapshot)]
+
+    response = StreamingHttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let a proxy buffer the stream
+    return response
+
+
+# =========================
+# SYNC / CHANGE FEED
+# =========================
+
+@login_required
+def change_feed(request):
+    """
+    Incremental sync for mobile/kiosk clients.
+
+    GET /sync/changes/?since=<cursor> returns everything changed after the
+    cursor plus a new cursor to send next time. Without ``since`` it returns
+    a full dump in pages: follow ``next`` with ?page=<next> until the
+    response carries the cursor.
+    """
+    try:
+        cursor = parse_cursor(request.GET.get("since"))
+        page = parse_page(request.GET.get("page"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    return redirect("client-routines")
\ No newline at end of file
+    if cursor is None:
+        return JsonResponse(full_dump(request.user, page))
+    return JsonResponse(changes_since(cursor, request.user))
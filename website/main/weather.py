@@ -0,0 +1,123 @@
+"""
+OpenWeatherMap data for the home page and the dashboard.
+
+Views only read what is cached. On a cache miss they queue a refresh
+(main.tasks.refresh_weather) and render without weather, so a slow or
+unreachable API never holds up a page. Only the first miss queues one;
+the others see the refresh lock until the worker has filled the cache.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+
+API_URL = 'http://api.openweathermap.org/data/2.5/{endpoint}?q={city}&appid={key}&units=metric'
+
+# How long a queued refresh blocks the next one, in case the worker is down
+REFRESH_LOCK_SECONDS = 60
+
+
+def _cache_key(kind, city):
+    return f"weather:{kind}:{city.lower()}"
+
+
+def _get_json(url):
+    """GET a JSON API. requests is imported here so it stays off the boot path."""
+    import requests
+    return requests.get(url, timeout=settings.WEATHER_TIMEOUT).json()
+
+
+def fetch_current(city):
+    """Current conditions: {'weather_data': {...}, 'error_message': str|None}"""
+    url = API_URL.format(endpoint='weather', city=city, key=settings.OPENWEATHER_API_KEY)
+    weather_data = {}
+    error_message = None
+
+    try:
+        response = _get_json(url)
+        if response.get('cod') != 200:
+            error_message = response.get('message', 'Error retrieving weather data.')
+
+        weather_data = {
+            'city': response.get('name', city),
+            'temperature': response.get('main', {}).get('temp'),
+            'description': response.get('weather', [{}])[0].get('description'),
+            'wind_speed': response.get('wind', {}).get('speed'),
+            'icon': response.get('weather', [{}])[0].get('icon'),
+        }
+    except (ValueError, OSError) as e:
+        # OSError covers requests' connection errors and timeouts
+        error_message = str(e)
+
+    return {'weather_data': weather_data, 'error_message': error_message}
+
+
+def fetch_forecast(city):
+    """Three-day forecast: {'city', 'daily_forecasts', 'error_message'}"""
+    url = API_URL.format(endpoint='forecast', city=city, key=settings.OPENWEATHER_API_KEY)
+    error_message = None
+
+    try:
+        response = _get_json(url)
+        if response.get('cod') != '200' and response.get('cod') != 200:
+            error_message = response.get('message', 'Error retrieving weather data.')
+
+        city_name = response['city']['name']
+        forecast_list = response['list']
+    except (ValueError, KeyError, OSError) as e:
+        error_message = error_message or str(e)
+        city_name = city
+        forecast_list = []
+
+    # Dictionary to store one forecast entry per day
+    daily_forecasts = {}
+
+    for entry in forecast_list:
+        dt_object = datetime.strptime(entry['dt_txt'], '%Y-%m-%d %H:%M:%S')
+        date_key = dt_object.date()
+        if date_key not in daily_forecasts and len(daily_forecasts) < 3:
+            daily_forecasts[date_key] = {
+                'temp': entry['main']['temp'],
+                'description': entry['weather'][0]['description'].capitalize(),
+                'wind_speed': entry['wind']['speed'],
+                'icon_code': entry['weather'][0]['icon'],
+                'day_name': dt_object.strftime('%A'),
+            }
+
+    return {
+        'city': city_name,
+        'daily_forecasts': list(daily_forecasts.values()),
+        'error_message': error_message,
+    }
+
+
+def refresh(city):
+    """Fetch both reports and cache them. Runs in the background worker."""
+    cache.set_many(
+        {
+            _cache_key('current', city): fetch_current(city),
+            _cache_key('forecast', city): fetch_forecast(city),
+        },
+        timeout=settings.WEATHER_CACHE_SECONDS,
+    )
+    cache.delete(_cache_key('refreshing', city))
+
+
+def _cached(kind, city):
+    if not city:  # no branch set up yet
+        return None
+    data = cache.get(_cache_key(kind, city))
+    if data is None and cache.add(_cache_key('refreshing', city), True, REFRESH_LOCK_SECONDS):
+        from .queue import enqueue
+        enqueue('refresh_weather', city)
+        # With TASKS_EAGER the refresh already ran
+        data = cache.get(_cache_key(kind, city))
+    return data
+
+
+def current_weather(city):
+    return _cached('current', city) or {'weather_data': {}, 'error_message': None}
+
+
+def forecast(city):
+    return _cached('forecast', city) or {'city': city, 'daily_forecasts': [], 'error_message': None}
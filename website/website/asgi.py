@@ -3,6 +3,11 @@ ASGI config for website project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is what the Procfile serves, with uvicorn workers under gunicorn (see
+gunicorn.conf.py), because the live occupancy stream (main/occupancy.py)
+needs it. Under the WSGI entry point the stream falls back to periodic
+reconnects.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -14,3 +19,13 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 
 application = get_asgi_application()
+
+# Precompile the templates in the web server only: management commands, the
+# worker and the tests never import this module. With preload_app
+# (gunicorn.conf.py) it runs once in the master, before the workers fork.
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from main.templating import warm_templates
+
+    warm_templates()
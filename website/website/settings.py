@@ -19,15 +19,17 @@ from decouple import config
 #We need to add the loading logic at the very top (before any variable uses).
 
 
-from dotenv import load_dotenv # 👈 Import the load_dotenv function
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # 1. LOAD THE .ENV FILE
-# This looks for the .env file in the current working directory, 
-# which should be the BASE_DIR (the project root).
-load_dotenv()
+# Looked up next to manage.py and in the repository root. In production
+# (Heroku) there is no .env file, so python-dotenv isn't even imported.
+for _env_file in (BASE_DIR / '.env', BASE_DIR.parent / '.env'):
+    if _env_file.is_file():
+        from dotenv import load_dotenv
+        load_dotenv(_env_file)
+        break
 
 # Retrieve the OPENWEATHER_API_KEY
 OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY')
@@ -75,6 +77,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.ProfilingMiddleware',
+    'main.middleware.LocationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,22 +86,38 @@ MIDDLEWARE = [
 #ROOT_URLCONF = 'website.website.urls'
 ROOT_URLCONF = 'website.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Parse each template once per worker and keep it in memory
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also records render time per template (main/templating.py)
+        'BACKEND': 'main.templating.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'], #modified from [] to include templates directory
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.locations.location',
             ],
         },
     },
 ]
 
+# Precompile all main/templates/*.html when the web server boots (website/asgi.py, wsgi.py)
+TEMPLATE_WARMUP = config('TEMPLATE_WARMUP', default=not DEBUG, cast=bool)
+
+# Renders slower than this are logged as warnings
+TEMPLATE_SLOW_RENDER_MS = 200
+
 WSGI_APPLICATION = 'website.wsgi.application'
 
 
@@ -117,6 +137,56 @@ DATABASES = {
     )
 }
 
+# Cache
+# Redis when REDIS_URL is set. Without it, per-process memory in development
+# and the database cache table in production (created by the Procfile's
+# release step), because the web workers and the task worker must share
+# what they cache: weather, rate-limit counters, report results.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
+# Sessions
+# SESSION_MODE picks where logged-in sessions live:
+#   db             - one SELECT on django_session per request (Django's default)
+#   cached_db      - read from the cache, written through to the DB
+#   signed_cookies - no server-side storage at all, nothing to purge
+# cached_db only saves queries with Redis (REDIS_URL): on the DatabaseCache
+# fallback the session read moves from django_session to django_cache.
+SESSION_MODE = config('SESSION_MODE', default='db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_MODE not in SESSION_ENGINES:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f"SESSION_MODE must be one of {', '.join(SESSION_ENGINES)}, not {SESSION_MODE!r}."
+    )
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# Expired rows are removed by `manage.py purge_sessions` (run it from a scheduler)
+SESSION_PURGE_BATCH_SIZE = 5000
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -136,6 +206,112 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# Argon2id (when argon2-cffi is installed) with OWASP's minimum parameters:
+# 19 MiB, 2 passes, 1 lane. Much cheaper per login than Django's defaults
+# (100 MiB, 8 lanes) during a class-start rush, still memory-hard. Existing
+# PBKDF2 hashes are upgraded on the user's next login (main/hashers.py).
+ARGON2_TIME_COST = config('ARGON2_TIME_COST', default=2, cast=int)
+ARGON2_MEMORY_COST = config('ARGON2_MEMORY_COST', default=19456, cast=int)  # KiB
+ARGON2_PARALLELISM = config('ARGON2_PARALLELISM', default=1, cast=int)
+PBKDF2_ITERATIONS = config('PBKDF2_ITERATIONS', default=600000, cast=int)
+
+PASSWORD_HASHERS = [
+    'main.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS.insert(0, 'main.hashers.TunedArgon2PasswordHasher')
+except ImportError:
+    pass
+
+# Login/register throttling (main/ratelimit.py): scope -> {key: (attempts, seconds)}
+RATELIMITS = {
+    'login': {'ip': (30, 60), 'username': (5, 60)},
+    'register': {'ip': (10, 600)},
+}
+# Behind the Heroku router REMOTE_ADDR is the router, not the client
+RATELIMIT_USE_X_FORWARDED_FOR = 'DYNO' in os.environ
+
+
+# Background tasks (main/queue.py, run by `manage.py run_worker`)
+# Eager mode runs tasks inline, so local development needs no worker.
+TASKS_EAGER = config('TASKS_EAGER', default=DEBUG, cast=bool)
+TASKS_CONCURRENCY = config('TASKS_CONCURRENCY', default=4, cast=int)
+TASKS_POLL_INTERVAL = 1.0  # seconds between polls when the queue is empty
+TASKS_MAX_ATTEMPTS = 3
+TASKS_RETRY_BACKOFF = 10  # seconds, doubled on every retry
+TASKS_LOCK_TIMEOUT = 600  # a 'running' task older than this is assumed dead
+TASKS_KEEP_DAYS = 7  # finished tasks are deleted after this long
+TASKS_PRUNE_INTERVAL = 3600  # seconds between prunes in the worker
+
+# Change feed (main/sync.py)
+SYNC_PAGE_SIZE = 1000  # rows per page of the first, full sync
+SYNC_CURSOR_MARGIN = 60  # seconds re-sent every time, for late commits
+
+# Member archival (main/archive.py, `manage.py archive_members`)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+ARCHIVE_BATCH_SIZE = 500
+
+# Gym branches (main/locations.py): slug of the branch anonymous visitors see
+DEFAULT_LOCATION = config('DEFAULT_LOCATION', default='mendoza')
+
+# Live routine occupancy over server-sent events (main/occupancy.py).
+# "poll" works with any number of workers; "memory" only in one process.
+OCCUPANCY_BACKEND = config('OCCUPANCY_BACKEND', default='poll')
+OCCUPANCY_POLL_INTERVAL = 2  # seconds
+OCCUPANCY_STREAM_SECONDS = 300  # then the browser reconnects
+OCCUPANCY_RETRY_MS = 5000  # browser reconnect delay (WSGI: the refresh rate)
+
+# Reports (main/reports.py). Prices are per 30 days and only used to
+# estimate revenue.
+PLAN_PRICES = {'basic': '20.00', 'premium': '35.00', 'vip': '60.00'}
+REPORT_CACHE_SECONDS = 15 * 60
+
+# Routine recommendations (main/recommendations.py, rebuilt by
+# `manage.py build_recommendations`)
+RECOMMENDATION_TOP_K = 10  # neighbors stored per routine
+RECOMMENDATION_LIMIT = 3  # routines shown to a client
+
+# Request profiling (main/profiling.py). When enabled, admins can profile
+# any request with ?profile=cprofile or ?profile=sample, and
+# PROFILING_SAMPLE_RATE of all requests get PROFILING_MODE. Downloads are in
+# the admin panel.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_MODE = 'sample'
+PROFILING_INTERVAL = 0.005  # seconds between stack samples; shorter requests get none
+PROFILING_KEEP = 100  # newest profiles kept (RequestProfile rows)
+
+# Weather (main/weather.py)
+WEATHER_CACHE_SECONDS = 600
+WEATHER_TIMEOUT = 5
+
+# Email
+# Printed to the console unless an SMTP server is configured
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Gym & Fitness <no-reply@localhost>')
+
+# Membership expiry notices (main/notifications.py, manage.py send_expiry_notices)
+MEMBERSHIP_EXPIRY_NOTICE_DAYS = (7, 1)
+NOTIFICATION_BACKEND = 'main.notifications.EmailNotificationBackend'
+NOTIFICATION_BATCH_SIZE = 500
+# Messages/second, 0 = no limit. At 100/s a run takes about 17 minutes per
+# 100,000 members notified; raise it (or pass --rate-limit) if the mail
+# provider allows more.
+NOTIFICATION_RATE_LIMIT = config('NOTIFICATION_RATE_LIMIT', default=100, cast=int)
+NOTIFICATION_MAX_RETRIES = 3
+NOTIFICATION_RETRY_BACKOFF = 2.0  # seconds, doubled on every retry
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -158,8 +334,24 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',  # Local static files
 ]
 
-# Whitenoise configuration for static files in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Whitenoise configuration for static files in production.
+# Hashes, minifies and gzip/Brotli-compresses files and writes resized
+# WebP/AVIF image variants during collectstatic (see main/storage.py).
+STATICFILES_STORAGE = 'main.storage.OptimizedStaticFilesStorage'
+
+# Widths generated for images under main/images, used by {% responsive_image %}
+RESPONSIVE_IMAGE_WIDTHS = (480, 960, 1600)
+
+# Hashed files are already served with "Cache-Control: max-age=315360000,
+# public, immutable" by WhiteNoise; this only affects unhashed URLs.
+WHITENOISE_MAX_AGE = 0 if DEBUG else 3600
+
+# AVIF is already compressed, don't waste collectstatic time on it
+WHITENOISE_SKIP_COMPRESS_EXTENSIONS = (
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'avif', 'zip', 'gz', 'tgz', 'bz2',
+    'tbz', 'xz', 'br', 'swf', 'flv', 'woff', 'woff2', '3gp', '3gpp', 'asf',
+    'avi', 'm4v', 'mov', 'mp4', 'mpeg', 'mpg', 'webm', 'wmv',
+)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -169,5 +361,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 
-import django_heroku
-django_heroku.settings(locals())
\ No newline at end of file
+# Heroku sets $DYNO on every dyno; django_heroku is only needed (and only
+# worth its import time) there.
+if 'DYNO' in os.environ:
+    import django_heroku
+    # Static files are configured above, keep our storage instead of Heroku's default
+    django_heroku.settings(locals(), staticfiles=False)
\ No newline at end of file
@@ -15,3 +15,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 #os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.website.settings')
 
 application = get_wsgi_application()
+
+# Precompile the templates, as in website/asgi.py
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from main.templating import warm_templates
+
+    warm_templates()